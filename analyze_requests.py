@@ -0,0 +1,136 @@
+"""Latency percentiles per endpoint from the request telemetry log.
+
+    python analyze_requests.py                              # logs/request_log.jsonl + rotations
+    python analyze_requests.py --window 15 --endpoint api_ai_optimize --endpoint api_tasks
+    python analyze_requests.py --since 2026-01-05T00:00 --json > report.json
+
+The log is streamed line by line (rotated files oldest first) and each
+time window is reported as soon as the log has moved two windows past it,
+so memory stays bounded by the traffic of the windows still open.
+Records that arrive for a window already reported are counted as late and
+dropped rather than reopening it.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'request_log.jsonl')
+
+
+def log_files(path):
+    """The log and its rotations, oldest first"""
+    rotated = [p for p in glob.glob(f'{path}.*') if p.rsplit('.', 1)[1].isdigit()]
+    rotated.sort(key=lambda p: int(p.rsplit('.', 1)[1]), reverse=True)
+    return rotated + ([path] if os.path.exists(path) else [])
+
+
+def iter_records(paths):
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # a torn final line while the writer is mid-flush
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def summarize(window_start, by_endpoint):
+    rows = []
+    for endpoint, samples in sorted(by_endpoint.items()):
+        latencies = sorted(s[0] for s in samples)
+        db_times = sorted(s[1] for s in samples)
+        rows.append({
+            'window': datetime.fromtimestamp(window_start).isoformat(timespec='minutes'),
+            'endpoint': endpoint,
+            'count': len(samples),
+            'errors': sum(1 for s in samples if s[2] >= 500),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1],
+            'db_p95_ms': percentile(db_times, 0.95),
+        })
+    return rows
+
+
+def analyze(records, window_seconds, endpoints=None, since=None, counts=None):
+    """Yield per-endpoint summary rows, one time window at a time.
+
+    counts, if given, gets counts['late'] incremented for each record
+    dropped because its window had already been reported.
+    """
+    windows = defaultdict(lambda: defaultdict(list))
+    emitted_until = None  # start of the latest window already reported
+    if counts is not None:
+        counts.setdefault('late', 0)
+    for record in records:
+        ts = record.get('ts')
+        endpoint = record.get('endpoint') or record.get('path')
+        if ts is None or (since and ts < since) or (endpoints and endpoint not in endpoints):
+            continue
+        window = int(ts // window_seconds * window_seconds)
+        if emitted_until is not None and window <= emitted_until:
+            if counts is not None:
+                counts['late'] += 1
+            continue
+        windows[window][endpoint].append(
+            (record.get('latency_ms') or 0.0, record.get('db_ms') or 0.0, record.get('status') or 0))
+        # Writers flush in batches, so allow one window of reordering before closing one
+        for closed in sorted(w for w in windows if w < window - window_seconds):
+            emitted_until = closed
+            yield from summarize(closed, windows.pop(closed))
+    for window in sorted(windows):
+        yield from summarize(window, windows[window])
+
+
+def print_table(rows):
+    header = f"{'window':<17} {'endpoint':<24} {'count':>7} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} {'db p95':>9}"
+    print(header)
+    print('-' * len(header))
+    last_window = None
+    for row in rows:
+        window = row['window'] if row['window'] != last_window else ''
+        last_window = row['window']
+        print(f"{window:<17} {row['endpoint']:<24} {row['count']:>7} {row['errors']:>5} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+              f"{row['max_ms']:>9.1f} {row['db_p95_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-endpoint latency percentiles from the request log')
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG, help='log path (rotations are read too)')
+    parser.add_argument('--window', type=float, default=60, help='window size in minutes (default: 60)')
+    parser.add_argument('--endpoint', action='append', help='only these endpoints (repeatable)')
+    parser.add_argument('--since', help='ignore records before this ISO time, e.g. 2026-01-05T09:00')
+    parser.add_argument('--json', action='store_true', help='print JSON lines instead of a table')
+    args = parser.parse_args(argv)
+
+    paths = log_files(args.log)
+    if not paths:
+        print(f"No request log at {args.log}", file=sys.stderr)
+        return 1
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    counts = {}
+    rows = analyze(iter_records(paths), args.window * 60, set(args.endpoint or ()), since, counts)
+
+    if args.json:
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print_table(rows)
+    if counts['late']:
+        print(f"{counts['late']} late records dropped (their window had already been reported)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
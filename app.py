@@ -1,26 +1,92 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory
+from flask import Flask, Response, stream_with_context, render_template, request, jsonify, redirect, url_for, flash, send_from_directory
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 import json
 import os
+import time
 from datetime import datetime, timedelta
 from tracker import AITaskOptimizer
-from models import db, User, Task, Schedule
+from models import db, User
+from task_repository import (load_task_groups, load_pending_tasks, page_tasks, task_to_dict,
+                             pending_task_to_dict, completed_task_to_dict, apply_task_ops,
+                             DEFAULT_PAGE_SIZE, MAX_BATCH_OPS)
+from user_repository import page_users, user_activity_counts, ADMIN_PAGE_SIZE
+from schedule_repository import (load_schedules, load_schedule, count_schedules, window_around, upsert_schedules,
+                                 summarize_schedule_items, MAX_BATCH_DAYS)
+from scheduler import (plan_day, plan_days, date_range, standard_schedule_data, iter_standard_schedule,
+                       profile_from_user)
+from optimizer_service import optimize_schedule, iter_optimize_schedule, invalidate_user
+from jobs import JobManager, JobFailed, QueueFull, DEFAULT_MAX_PENDING, DEFAULT_MAX_PENDING_PER_USER
+from telemetry import init_request_log
+from metrics import init_metrics, init_profiler, render_metrics, SCHEDULE_GENERATION
+from optimize_cache import get_cache
+from user_cache import UserCache, DEFAULT_TTL_SECONDS as DEFAULT_USER_CACHE_TTL
+import auth
+from auth import init_password_hashing, default_hash_workers, HashingBusy, LoginThrottle
+from database import init_database
 from forms import LoginForm, RegistrationForm, ProfileForm, TaskForm
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///task_optimizer.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Initialize extensions
-db.init_app(app)
+# LLM provider behind /api/ai_optimize (see llm_providers.get_provider)
+for key in ('LLM_PROVIDER', 'LLM_API_URL', 'LLM_API_KEY', 'LLM_MODEL', 'LLM_TIMEOUT',
+            'LLM_MAX_RETRIES', 'LLM_MAX_CONCURRENCY', 'LLM_QUEUE_TIMEOUT'):
+    app.config[key] = os.environ.get(key)
+
+# Optimization result cache: in-process LRU plus a SQLite file shared by workers
+app.config['OPTIMIZE_CACHE_SIZE'] = os.environ.get('OPTIMIZE_CACHE_SIZE')
+app.config['OPTIMIZE_CACHE_TTL'] = os.environ.get('OPTIMIZE_CACHE_TTL')
+app.config['OPTIMIZE_CACHE_PATH'] = os.environ.get('OPTIMIZE_CACHE_PATH',
+                                                   os.path.join(app.instance_path, 'optimize_cache.db'))
+
+# Per-request telemetry (JSON lines, see telemetry.py); set REQUEST_LOG_PATH= to disable
+app.config['REQUEST_LOG_PATH'] = os.environ.get('REQUEST_LOG_PATH',
+                                                os.path.join(app.root_path, 'logs', 'request_log.jsonl'))
+app.config['REQUEST_LOG_MAX_BYTES'] = int(os.environ.get('REQUEST_LOG_MAX_BYTES') or 10 * 1024 * 1024)
+app.config['REQUEST_LOG_BACKUPS'] = int(os.environ.get('REQUEST_LOG_BACKUPS') or 5)
+
+# Seconds a worker reuses a logged-in user's row before re-reading it; 0 disables
+app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL))
+
+# Password hashing runs on a bounded pool (see auth.py); PASSWORD_HASH_WORKERS=0 hashes inline.
+# A stronger PASSWORD_HASH_METHOD (e.g. 'scrypt:65536:8:1') rehashes each password at its next login;
+# a weaker one only applies to new passwords.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', auth.DEFAULT_METHOD)
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', default_hash_workers()))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE') or auth.DEFAULT_QUEUE_PER_WORKER)
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or auth.DEFAULT_TIMEOUT_SECONDS)
+app.config['LOGIN_MAX_ACCOUNT_FAILURES'] = int(os.environ.get('LOGIN_MAX_ACCOUNT_FAILURES') or auth.DEFAULT_MAX_ACCOUNT_FAILURES)
+app.config['LOGIN_MAX_ADDRESS_FAILURES'] = int(os.environ.get('LOGIN_MAX_ADDRESS_FAILURES') or auth.DEFAULT_MAX_ADDRESS_FAILURES)
+app.config['LOGIN_FAILURE_WINDOW'] = int(os.environ.get('LOGIN_FAILURE_WINDOW') or auth.DEFAULT_FAILURE_WINDOW_SECONDS)
+
+# Opt-in cProfile dumps: admins add ?profile=1 to a request (see metrics.init_profiler)
+app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.root_path, 'logs', 'profiles'))
+
+# Initialize extensions; DATABASE_URL and the engine tuning come from the environment (see database.py)
+init_database(app, db)
+job_manager = JobManager(app, max_workers=int(os.environ.get('OPTIMIZE_JOB_WORKERS') or 4),
+                         max_pending=int(os.environ.get('OPTIMIZE_JOB_MAX_PENDING') or DEFAULT_MAX_PENDING),
+                         max_pending_per_user=int(os.environ.get('OPTIMIZE_JOB_MAX_PENDING_PER_USER')
+                                                  or DEFAULT_MAX_PENDING_PER_USER))
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
+user_cache = UserCache(ttl=app.config['USER_CACHE_TTL'])
+init_password_hashing(app)
+login_throttle = LoginThrottle(app.config['LOGIN_MAX_ACCOUNT_FAILURES'], app.config['LOGIN_MAX_ADDRESS_FAILURES'],
+                               app.config['LOGIN_FAILURE_WINDOW'])
+request_log = (init_request_log(app, app.config['REQUEST_LOG_PATH'], app.config['REQUEST_LOG_MAX_BYTES'],
+                                app.config['REQUEST_LOG_BACKUPS'])
+               if app.config['REQUEST_LOG_PATH'] else None)
+init_metrics(app)
+if app.config['PROFILER_ENABLED']:
+    init_profiler(app, app.config['PROFILE_DIR'])
 
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return user_cache.load(int(id))
 
 # Serve favicon
 @app.route('/favicon.ico')
@@ -33,60 +99,46 @@ def favicon():
 def get_today():
     return datetime.now().strftime("%Y-%m-%d")
 
-# Helper methods for time calculations
-def add_time(time_str, minutes):
-    """Add minutes to time string and return new time string"""
-    try:
-        # Parse time string (e.g., "7:00 AM")
-        if "AM" in time_str.upper() or "PM" in time_str.upper():
-            time_obj = datetime.strptime(time_str.strip(), "%I:%M %p")
-        else:
-            time_obj = datetime.strptime(time_str.strip(), "%H:%M")
-        
-        # Add minutes
-        new_time = time_obj + timedelta(minutes=minutes)
-        
-        # Return in same format
-        if "AM" in time_str.upper() or "PM" in time_str.upper():
-            return new_time.strftime("%I:%M %p").lstrip('0')
-        else:
-            return new_time.strftime("%H:%M")
-    except:
-        # Fallback to simple addition if parsing fails
-        return time_str
-
-def subtract_time(time_str, minutes):
-    """Subtract minutes from time string and return new time string"""
-    try:
-        # Parse time string (e.g., "7:00 AM")
-        if "AM" in time_str.upper() or "PM" in time_str.upper():
-            time_obj = datetime.strptime(time_str.strip(), "%I:%M %p")
-        else:
-            time_obj = datetime.strptime(time_str.strip(), "%H:%M")
-        
-        # Subtract minutes
-        new_time = time_obj - timedelta(minutes=minutes)
-        
-        # Return in same format
-        if "AM" in time_str.upper() or "PM" in time_str.upper():
-            result = new_time.strftime("%I:%M %p").lstrip('0')
-            # Fix formatting issue with single digit hours
-            if result.startswith(':'):
-                result = '12' + result
-            return result
-        else:
-            return new_time.strftime("%H:%M")
-    except:
-        # Fallback to simple subtraction if parsing fails
-        return time_str
-
-def parse_time_str(time_str):
-    try:
-        if "AM" in time_str.upper() or "PM" in time_str.upper():
-            return datetime.strptime(time_str.strip(), "%I:%M %p")
-        return datetime.strptime(time_str.strip(), "%H:%M")
-    except:
-        return datetime.strptime("7:00 AM", "%I:%M %p")
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_ndjson():
+    """True when the client asked for a streamed (NDJSON) schedule"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_schedule_response(items, finish):
+    """Stream a schedule generator as newline-delimited JSON records.
+
+    Every item the generator yields goes out at once as {"type": "item"};
+    when it returns, finish(result) yields the closing records (summary,
+    then the persistence ack). A failure mid-stream can no longer change
+    the status code, so it is reported as a final {"type": "error"} record.
+    """
+    def records():
+        try:
+            while True:
+                try:
+                    item = next(items)
+                except StopIteration as done:
+                    result = done.value
+                    break
+                yield json.dumps({"type": "item", "item": item}) + "\n"
+            for record in finish(result):
+                yield json.dumps(record) + "\n"
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Streaming schedule failed')
+            yield json.dumps({"type": "error", "error": "server_error", "message": str(e)}) + "\n"
+
+    return Response(stream_with_context(records()), mimetype=NDJSON_MIMETYPE,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def summary_record(schedule_data, **extra):
+    return dict({
+        "type": "summary",
+        "daily_summary": schedule_data.get("daily_summary", ""),
+        "tips": schedule_data.get("tips", []),
+        "unscheduled": schedule_data.get("unscheduled", []),
+    }, **extra)
 
 # Routes for authentication
 @app.route('/login', methods=['GET', 'POST'])
@@ -96,12 +148,26 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        username, address = form.username.data, request.remote_addr
+        retry_after = login_throttle.retry_after(username, address)
+        if retry_after:
+            flash(f'Too many failed sign-in attempts. Try again in {retry_after // 60 + 1} minutes.')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(retry_after)}
+        try:
+            user = User.query.filter_by(username=username).first()
+            valid = user is not None and user.check_password(form.password.data)
+            if valid and auth.hasher.needs_rehash(user.password_hash):
+                user.set_password(form.password.data)
+                db.session.commit()
+        except HashingBusy:
+            flash('The server is busy signing other people in. Please try again in a moment.')
+            return render_template('login.html', form=form), 503, {'Retry-After': '1'}
+        if valid:
+            login_throttle.succeeded(username)
             login_user(user, remember=form.remember_me.data)
             return redirect(url_for('index'))
-        else:
-            flash('Invalid username or password')
+        login_throttle.failed(username, address)
+        flash('Invalid username or password')
     
     return render_template('login.html', form=form)
 
@@ -113,7 +179,11 @@ def register():
     form = RegistrationForm()
     if form.validate_on_submit():
         user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except HashingBusy:
+            flash('The server is busy. Please try registering again in a moment.')
+            return render_template('register.html', form=form), 503, {'Retry-After': '1'}
         db.session.add(user)
         db.session.commit()
         flash('Congratulations, you are now a registered user!')
@@ -131,17 +201,16 @@ def logout():
 @login_required
 def index():
     # Get user's tasks
-    pending_tasks = Task.query.filter_by(user_id=current_user.id, status='pending').all()
-    completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').all()
-    schedules = Schedule.query.filter_by(user_id=current_user.id).all()
+    task_groups = load_task_groups(current_user.id)
     
     tasks_data = {
-        'pending': pending_tasks,
-        'completed': completed_tasks,
-        'schedules': {str(schedule.date): schedule.schedule_data for schedule in schedules}
+        'pending': task_groups['pending'],
+        'completed': task_groups['completed'],
+        'schedules': {}
     }
     
-    return render_template('index.html', profile=current_user, tasks=tasks_data)
+    return render_template('index.html', profile=current_user, tasks=tasks_data,
+                           schedule_count=count_schedules(current_user.id))
 
 @app.route('/profile')
 @login_required
@@ -170,12 +239,11 @@ def profile():
 @app.route('/tasks')
 @login_required
 def tasks():
-    pending_tasks = Task.query.filter_by(user_id=current_user.id, status='pending').all()
-    completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').all()
+    task_groups = load_task_groups(current_user.id)
     
     tasks_data = {
-        'pending': pending_tasks,
-        'completed': completed_tasks,
+        'pending': task_groups['pending'],
+        'completed': task_groups['completed'],
         'schedules': {}
     }
     
@@ -185,15 +253,16 @@ def tasks():
 @login_required
 def schedule():
     today = get_today()
-    schedules = Schedule.query.filter_by(user_id=current_user.id).all()
+    window_start, window_end = window_around(datetime.strptime(today, "%Y-%m-%d").date())
     
     tasks_data = {
         'pending': [],
         'completed': [],
-        'schedules': {str(schedule.date): schedule.schedule_data for schedule in schedules}
+        'schedules': load_schedules(current_user.id, window_start, window_end)
     }
     
-    return render_template('schedule.html', tasks=tasks_data, today=today)
+    return render_template('schedule.html', tasks=tasks_data, today=today,
+                           window_start=str(window_start), window_end=str(window_end))
 
 # API routes for profile
 @app.route('/api/profile', methods=['GET', 'POST'])
@@ -215,7 +284,10 @@ def api_profile():
         current_user.sleep_schedule = data.get('sleep_schedule', current_user.sleep_schedule)
         current_user.weekly_schedule = data.get('weekly_schedule', current_user.weekly_schedule)
         
+        user_id = current_user.id  # the commit expires current_user
         db.session.commit()
+        user_cache.invalidate(user_id)
+        invalidate_user(app.config, user_id)
         return jsonify({"status": "success", "message": "Profile updated"})
     
     # Return current user profile
@@ -236,209 +308,232 @@ def api_profile():
     return jsonify(profile_data)
 
 # API routes for tasks
+TASK_ACTION_MESSAGES = {
+    'add': "Task added",
+    'complete': "Task completed",
+    'reopen': "Task reopened",
+    'delete': "Task deleted",
+    'edit': "Task updated",
+}
+
+def single_task_action(data):
+    """One {"action": ...} object, answered in the original single-task shape"""
+    user_id = current_user.id
+    (result,), applied = apply_task_ops(user_id, [data])
+    if not applied:
+        return jsonify({"error": result['error'], "message": result['message']}), \
+            404 if result['error'] == 'not_found' else 400
+    db.session.commit()
+    invalidate_user(app.config, user_id)
+    response = {"status": "success", "message": TASK_ACTION_MESSAGES[result['action']]}
+    if result['action'] == 'add':
+        response['id'] = result['id']
+    return jsonify(response)
+
 @app.route('/api/tasks', methods=['GET', 'POST'])
 @login_required
 def api_tasks():
     if request.method == 'POST':
-        data = request.json
-        if data.get('action') == 'add':
-            task = Task(
-                user_id=current_user.id,
-                description=data.get('description'),
-                priority=data.get('priority'),
-                duration=data.get('duration'),
-                type=data.get('type'),
-                preferences=data.get('preferences'),
-                status='pending'
-            )
-            db.session.add(task)
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and 'ops' not in data:
+            return single_task_action(data)
+        
+        # Batch: a list of operations, bare or as {"ops": [...]}
+        ops = data.get('ops') if isinstance(data, dict) else data
+        if not isinstance(ops, list) or not ops:
+            return jsonify({"error": "invalid_batch", "message": "Send a non-empty list of operations"}), 400
+        if len(ops) > MAX_BATCH_OPS:
+            return jsonify({"error": "batch_too_large",
+                            "message": f"At most {MAX_BATCH_OPS} operations per request"}), 400
+        
+        user_id = current_user.id
+        results, applied = apply_task_ops(user_id, ops)
+        if applied:
             db.session.commit()
-            return jsonify({"status": "success", "message": "Task added"})
-        elif data.get('action') == 'complete':
-            task_id = data.get('id')
-            task = Task.query.filter_by(id=task_id, user_id=current_user.id).first()
-            if task:
-                task.status = 'completed'
-                task.completed_date = datetime.now()
-                db.session.commit()
-                return jsonify({"status": "success", "message": "Task completed"})
-    else:
-        # Get user's tasks
-        pending_tasks = Task.query.filter_by(user_id=current_user.id, status='pending').all()
-        completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').all()
+            invalidate_user(app.config, user_id)
+        failed = len(results) - applied
+        return jsonify({
+            "status": "success" if not failed else "partial" if applied else "error",
+            "applied": applied,
+            "failed": failed,
+            "results": results
+        })
+    elif request.args.get('legacy'):
+        # Unpaginated shape kept for older clients
+        task_groups = load_task_groups(current_user.id)
         
         tasks_data = {
-            'pending': [
-                {
-                    'id': task.id,
-                    'description': task.description,
-                    'priority': task.priority,
-                    'duration': task.duration,
-                    'type': task.type,
-                    'preferences': task.preferences,
-                    'status': task.status,
-                    'added_date': task.added_date.strftime("%Y-%m-%d") if task.added_date else None
-                } for task in pending_tasks
-            ],
-            'completed': [
-                {
-                    'id': task.id,
-                    'description': task.description,
-                    'type': task.type,
-                    'completed_date': task.completed_date.strftime("%Y-%m-%d") if task.completed_date else None
-                } for task in completed_tasks
-            ]
+            'pending': [pending_task_to_dict(task) for task in task_groups['pending']],
+            'completed': [completed_task_to_dict(task) for task in task_groups['completed']]
         }
         
         return jsonify(tasks_data)
+    else:
+        status = request.args.get('status', 'pending')
+        if status not in ('pending', 'completed'):
+            return jsonify({"error": "invalid_status", "message": "status must be 'pending' or 'completed'"}), 400
+        
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+            rows, next_cursor = page_tasks(
+                current_user.id,
+                status=status,
+                task_type=request.args.get('type'),
+                priority=request.args.get('priority'),
+                after=request.args.get('after'),
+                limit=limit,
+                newest_first=request.args.get('sort') == '-added_date'
+            )
+        except ValueError as e:
+            return jsonify({"error": "invalid_page", "message": str(e)}), 400
+        
+        return jsonify({
+            'status': status,
+            'tasks': [task_to_dict(task) for task in rows],
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        })
 
 # AI optimize
+def optimize_inputs(user_id):
+    """(profile, pending_tasks) for an optimization run"""
+    pending_tasks = load_pending_tasks(user_id)
+    if not pending_tasks:
+        raise JobFailed("No tasks", "AI needs tasks to optimize. Add tasks, then retry.")
+    return profile_from_user(db.session.get(User, user_id)), pending_tasks
+
+def run_optimize(user_id, day, prompt, report=lambda progress, message: None):
+    """Optimize and save one day's schedule; shared by the sync and job paths"""
+    profile, pending_tasks = optimize_inputs(user_id)
+
+    report(30, f"Optimizing {len(pending_tasks)} tasks")
+    started = time.perf_counter()
+    schedule_data, source, cached = optimize_schedule(profile, pending_tasks, day,
+                                                      prompt, app.config, app.logger, user_id)
+    SCHEDULE_GENERATION.observe(time.perf_counter() - started, endpoint='api_ai_optimize',
+                                source='cache' if cached else source)
+
+    report(90, "Saving schedule")
+    upsert_schedules(user_id, {day: schedule_data})
+    return {"status": "success", "date": str(day), "schedule": schedule_data, "source": source, "cached": cached}
+
+def optimize_job(job, user_id, day, prompt):
+    return run_optimize(user_id, day, prompt, lambda progress, message: job_manager.update(job, progress, message))
+
 @app.route('/api/ai_optimize', methods=['POST'])
 @login_required
 def api_ai_optimize():
+    data = request.json or {}
+    prompt = data.get('prompt', '').strip()
+    date_str = data.get('date', get_today())
     try:
-        data = request.json or {}
-        prompt = data.get('prompt', '').strip()
-        date_str = data.get('date', get_today())
-
-        pending_tasks = Task.query.filter_by(user_id=current_user.id, status='pending').all()
-        if not pending_tasks:
-            return jsonify({
-                "error": "No tasks",
-                "message": "AI needs tasks to optimize. Add tasks, then retry.",
-                "requires_tasks": True
-            }), 400
+        day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    except ValueError as e:
+        return jsonify({"error": "invalid_date", "message": str(e)}), 400
 
+    if wants_ndjson():
+        return stream_optimize(current_user.id, day, prompt)
+
+    # Default: enqueue and free the request thread; clients follow the job
+    if data.get('async', True) and not request.args.get('sync'):
         try:
-            sleep_schedule = json.loads(current_user.sleep_schedule) if isinstance(current_user.sleep_schedule, str) else (current_user.sleep_schedule or {})
-        except Exception:
-            sleep_schedule = {}
-        wake_time = (sleep_schedule or {}).get('wake_time', '7:00 AM')
-        bedtime = (sleep_schedule or {}).get('bedtime', '11:00 PM')
-
-        # Simple prompt parsing to adjust blocks
-        p = prompt.lower()
-        wants_college = any(k in p for k in ["college", "class", "lecture"]) or (current_user.role and "student" in current_user.role)
-        wants_exam = "exam" in p or "test" in p
-        wants_morning_focus = "morning" in p and ("focus" in p or "deep" in p)
-        # Extract time range like "7:00 AM to 5:30 PM"
-        import re
-        time_match = re.search(r"(\d{1,2}:\d{2}\s*(?:am|pm))\s*(?:to|-)\s*(\d{1,2}:\d{2}\s*(?:am|pm))", p, re.IGNORECASE)
-        college_time_range = None
-        if time_match:
-            start_str = time_match.group(1).upper().replace('AM',' AM').replace('PM',' PM').replace('  ',' ')
-            end_str = time_match.group(2).upper().replace('AM',' AM').replace('PM',' PM').replace('  ',' ')
-            # Normalize and validate
-            try:
-                _ = datetime.strptime(start_str.strip(), "%I:%M %p")
-                _ = datetime.strptime(end_str.strip(), "%I:%M %p")
-                college_time_range = (start_str.strip(), end_str.strip())
-            except Exception:
-                college_time_range = None
-
-        schedule_items = []
-
-        def fmt(dt):
-            return dt.strftime("%I:%M %p").lstrip('0')
-
-        wake_dt = parse_time_str(wake_time)
-        cursor = wake_dt
-
-        morning_end_dt = cursor + timedelta(minutes=30)
-        schedule_items.append({"time": f"{fmt(cursor)} - {fmt(morning_end_dt)}", "task": "Morning routine & light stretching", "reason": "Gentle start", "type": "health"})
-        cursor = morning_end_dt
-
-        he_target = wake_dt + timedelta(minutes=(60 if wants_morning_focus else 90))
-        he_start_dt = max(cursor, he_target)
-        he_end_dt = he_start_dt + timedelta(minutes=120)
-
-        c_start_dt = None
-        c_end_dt = None
-        if college_time_range:
-            c_start_dt = parse_time_str(college_time_range[0])
-            c_end_dt = parse_time_str(college_time_range[1])
-
-        if c_start_dt and he_start_dt < c_start_dt:
-            if he_end_dt <= c_start_dt:
-                schedule_items.append({"time": f"{fmt(he_start_dt)} - {fmt(he_end_dt)}", "task": f"Deep work - {pending_tasks[0].description}", "reason": "High-energy block aligned to your prompt", "type": pending_tasks[0].type})
-                cursor = he_end_dt
+            job = job_manager.submit(current_user.id, 'ai_optimize', optimize_job, current_user.id, day, prompt)
+        except QueueFull as e:
+            # Your own backlog is a 429; the whole server being saturated is a 503
+            if e.scope == 'user':
+                body = {"error": "too_many_jobs", "message": "You already have optimizations running. Wait for one to finish."}
+                status = 429
             else:
-                adj_end_dt = c_start_dt
-                if (adj_end_dt - he_start_dt).total_seconds() >= 1800:
-                    schedule_items.append({"time": f"{fmt(he_start_dt)} - {fmt(adj_end_dt)}", "task": f"Deep work - {pending_tasks[0].description}", "reason": "High-energy block aligned to your prompt", "type": pending_tasks[0].type})
-                    cursor = adj_end_dt
-        elif not c_start_dt:
-            schedule_items.append({"time": f"{fmt(he_start_dt)} - {fmt(he_end_dt)}", "task": f"Deep work - {pending_tasks[0].description}", "reason": "High-energy block aligned to your prompt", "type": pending_tasks[0].type})
-            cursor = he_end_dt
-
-        if not c_start_dt or (cursor + timedelta(minutes=30)) <= c_start_dt:
-            break_start_dt = cursor + timedelta(minutes=15)
-            break_end_dt = break_start_dt + timedelta(minutes=15)
-            schedule_items.append({"time": f"{fmt(break_start_dt)} - {fmt(break_end_dt)}", "task": "Break", "reason": "Short reset", "type": "break"})
-            cursor = break_end_dt
-
-        if c_start_dt:
-            if cursor < c_start_dt:
-                cursor = c_start_dt
-            schedule_items.append({"time": f"{fmt(c_start_dt)} - {fmt(c_end_dt)}", "task": "College classes", "reason": "Prompt-specified college hours", "type": "college"})
-            cursor = c_end_dt
-        else:
-            work_start_dt = cursor + timedelta(minutes=15)
-            work_end_dt = work_start_dt + timedelta(minutes=90)
-            task2 = f"Project work - {pending_tasks[1].description if len(pending_tasks) > 1 else 'Additional tasks'}"
-            type2 = (pending_tasks[1].type if len(pending_tasks) > 1 else "work")
-            schedule_items.append({"time": f"{fmt(work_start_dt)} - {fmt(work_end_dt)}", "task": task2, "reason": "Continued focus", "type": type2})
-            cursor = work_end_dt
-
-        lunch_start_dt = cursor + timedelta(minutes=60)
-        lunch_end_dt = lunch_start_dt + timedelta(minutes=60)
-        schedule_items.append({"time": f"{fmt(lunch_start_dt)} - {fmt(lunch_end_dt)}", "task": "Lunch break", "reason": "Nourishment", "type": "personal"})
-        cursor = lunch_end_dt
-
-        afternoon_start_dt = cursor + timedelta(minutes=60)
-        afternoon_end_dt = afternoon_start_dt + timedelta(minutes=90)
-        schedule_items.append({"time": f"{fmt(afternoon_start_dt)} - {fmt(afternoon_end_dt)}", "task": "College/Work commitments" if wants_college else "Task review & planning", "reason": "Aligned with prompt", "type": "college/work"})
-        cursor = afternoon_end_dt
-
-        # Family
-        family_time = current_user.family_time or "6:00 PM - 7:00 PM"
-        schedule_items.append({"time": family_time, "task": "Family time", "reason": "Preferences", "type": "family"})
-
-        # Workout
-        workout_pref = (current_user.workout_preference or "evening").lower()
-        workout_time = "7:00 PM - 8:00 PM"
-        if "morning" in workout_pref:
-            workout_time = f"{add_time(wake_time, 30)} - {add_time(wake_time, 90)}"
-        schedule_items.append({"time": workout_time, "task": "Workout session", "reason": f"{workout_pref.title()} workout", "type": "health"})
-
-        # Evening review
-        review_time_start = subtract_time(bedtime, 60)
-        schedule_items.append({"time": f"{review_time_start} - {bedtime}", "task": "Review and plan for tomorrow", "reason": "Reflect and prepare", "type": "personal"})
-
-        schedule_data = {
-            "schedule": schedule_items,
-            "daily_summary": f"Optimized using profile and {len(pending_tasks)} tasks. Prompt: {prompt}",
-            "tips": [
-                "Use high-energy blocks for deep work",
-                "Take short breaks every hour",
-                "Hydrate and move regularly"
-            ]
-        }
+                body = {"error": "busy", "message": "The optimizer is busy. Please try again shortly."}
+                status = 503
+            return jsonify(body), status, {'Retry-After': str(e.retry_after)}
+        return jsonify({
+            "status": "queued",
+            "job_id": job.id,
+            "status_url": url_for('api_job', job_id=job.id),
+            "events_url": url_for('api_job_events', job_id=job.id)
+        }), 202
 
-        # Save
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        existing = Schedule.query.filter_by(user_id=current_user.id, date=date_obj).first()
-        if existing:
-            existing.schedule_data = schedule_data
-            db.session.commit()
-        else:
-            new_schedule = Schedule(user_id=current_user.id, date=date_obj, schedule_data=schedule_data)
-            db.session.add(new_schedule)
-            db.session.commit()
-        return jsonify({"status": "success", "date": date_str, "schedule": schedule_data})
+    try:
+        return jsonify(run_optimize(current_user.id, day, prompt))
+    except JobFailed as e:
+        return jsonify({"error": e.error, "message": e.message, "requires_tasks": e.error == "No tasks"}), 400
     except Exception as e:
         return jsonify({"error": "server_error", "message": f"Failed to optimize: {str(e)}"}), 500
 
+def stream_optimize(user_id, day, prompt):
+    try:
+        profile, pending_tasks = optimize_inputs(user_id)
+    except JobFailed as e:
+        return jsonify({"error": e.error, "message": e.message, "requires_tasks": e.error == "No tasks"}), 400
+
+    started = time.perf_counter()
+
+    def finish(result):
+        schedule_data, source, cached = result
+        SCHEDULE_GENERATION.observe(time.perf_counter() - started, endpoint='api_ai_optimize',
+                                    source='cache' if cached else source)
+        yield summary_record(schedule_data, source=source, cached=cached)
+        upsert_schedules(user_id, {day: schedule_data})
+        yield {"type": "saved", "status": "success", "date": str(day)}
+
+    items = iter_optimize_schedule(profile, pending_tasks, day, prompt, app.config, app.logger, user_id)
+    return ndjson_schedule_response(items, finish)
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job(job_id):
+    job = job_manager.get(job_id, current_user.id)
+    if job is None:
+        return jsonify({"error": "not_found", "message": "No such job"}), 404
+    # Long-poll: ?wait=<seconds>&since=<version> blocks until the job moves on
+    try:
+        wait = min(float(request.args.get('wait', 0) or 0), 30.0)
+        since = int(request.args.get('since', -1))
+    except ValueError:
+        return jsonify({"error": "invalid_request", "message": "wait and since must be numbers"}), 400
+    return jsonify(job_manager.wait(job, since, wait) if wait > 0 else job.to_dict())
+
+@app.route('/api/jobs/<job_id>/events')
+@login_required
+def api_job_events(job_id):
+    job = job_manager.get(job_id, current_user.id)
+    if job is None:
+        return jsonify({"error": "not_found", "message": "No such job"}), 404
+    return Response(job_manager.events(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/schedules', methods=['GET'])
+@login_required
+def api_schedules():
+    try:
+        focus = datetime.strptime(request.args.get('date', get_today()), "%Y-%m-%d").date()
+        default_start, default_end = window_around(focus)
+        start = datetime.strptime(request.args['from'], "%Y-%m-%d").date() if request.args.get('from') else default_start
+        end = datetime.strptime(request.args['to'], "%Y-%m-%d").date() if request.args.get('to') else default_end
+        if end < start:
+            raise ValueError("'to' must not be before 'from'")
+        schedules = load_schedules(current_user.id, start, end)
+    except ValueError as e:
+        return jsonify({"error": "invalid_range", "message": str(e)}), 400
+    
+    return jsonify({"from": str(start), "to": str(end), "schedules": schedules})
+
+@app.route('/api/schedules/summary', methods=['GET'])
+@login_required
+def api_schedules_summary():
+    """Blocks and minutes per item type over a date range (default: the 30 days up to today)"""
+    try:
+        end = datetime.strptime(request.args.get('to') or get_today(), "%Y-%m-%d").date()
+        start = datetime.strptime(request.args['from'], "%Y-%m-%d").date() if request.args.get('from') else end - timedelta(days=29)
+        if end < start:
+            raise ValueError("'to' must not be before 'from'")
+        types = summarize_schedule_items(current_user.id, start, end)
+    except ValueError as e:
+        return jsonify({"error": "invalid_range", "message": str(e)}), 400
+    
+    return jsonify({"from": str(start), "to": str(end), "types": types})
+
 # API routes for schedule
 @app.route('/api/schedule', methods=['POST'])
 @login_required
@@ -447,9 +542,11 @@ def api_schedule():
     date_str = data.get('date', get_today())
     
     # Check if schedule already exists for this date
-    existing_schedule = Schedule.query.filter_by(user_id=current_user.id, date=datetime.strptime(date_str, "%Y-%m-%d").date()).first()
+    existing_schedule = load_schedule(current_user.id, datetime.strptime(date_str, "%Y-%m-%d").date())
     if existing_schedule:
-        return jsonify(existing_schedule.schedule_data)
+        if wants_ndjson():
+            return stream_saved_schedule(date_str, existing_schedule)
+        return jsonify(existing_schedule)
     
     # Check if user has completed their profile
     if not current_user.name or not current_user.sleep_schedule:
@@ -459,7 +556,7 @@ def api_schedule():
         }), 400
     
     # Check if user has any pending tasks
-    pending_tasks = Task.query.filter_by(user_id=current_user.id, status='pending').all()
+    pending_tasks = load_pending_tasks(current_user.id)
     
     if not pending_tasks:
         return jsonify({
@@ -467,134 +564,82 @@ def api_schedule():
             "message": "Please add some tasks before generating a schedule. The AI needs tasks to optimize your day."
         }), 400
     
-    # Parse sleep schedule
-    try:
-        sleep_schedule = json.loads(current_user.sleep_schedule) if isinstance(current_user.sleep_schedule, str) else current_user.sleep_schedule
-        wake_time = sleep_schedule.get('wake_time', '7:00 AM')
-        bedtime = sleep_schedule.get('bedtime', '11:00 PM')
-    except:
-        wake_time = '7:00 AM'
-        bedtime = '11:00 PM'
-    
-    # Generate schedule based on user's actual tasks and preferences
-    schedule_items = []
-    
-    # Morning routine based on wake time
-    morning_end = add_time(wake_time, 30)
-    schedule_items.append({
-        "time": f"{wake_time} - {morning_end}",
-        "task": "Morning routine & light stretching",
-        "reason": "Gentle start to energize your day based on your wake up time",
-        "type": "health"
-    })
-    
-    # High energy time for important tasks
-    high_energy_start = add_time(wake_time, 60)  # 1 hour after waking
-    high_energy_end = add_time(high_energy_start, 120)  # 2 hours block
-    
-    schedule_items.append({
-        "time": f"{high_energy_start} - {high_energy_end}",
-        "task": f"Deep work session - {pending_tasks[0].description}" if pending_tasks else "Focused work",
-        "reason": "High energy time for demanding tasks based on your preferences",
-        "type": pending_tasks[0].type if pending_tasks else "work"
-    })
-    
-    # Break
-    break_time_start = add_time(high_energy_end, 15)
-    break_time_end = add_time(break_time_start, 15)
-    
-    schedule_items.append({
-        "time": f"{break_time_start} - {break_time_end}",
-        "task": "Break",
-        "reason": "Short break to refresh your mind",
-        "type": "break"
-    })
-    
-    # Continue with tasks
-    work_time_start = add_time(break_time_end, 15)
-    work_time_end = add_time(work_time_start, 90)  # 1.5 hours
-    
-    schedule_items.append({
-        "time": f"{work_time_start} - {work_time_end}",
-        "task": f"Project work - {pending_tasks[1].description if len(pending_tasks) > 1 else 'Additional tasks'}",
-        "reason": "Continued focus time for complex tasks",
-        "type": pending_tasks[1].type if len(pending_tasks) > 1 else "work"
-    })
-    
-    # Lunch break
-    lunch_start = add_time(work_time_end, 60)
-    lunch_end = add_time(lunch_start, 60)
-    
-    schedule_items.append({
-        "time": f"{lunch_start} - {lunch_end}",
-        "task": "Lunch break",
-        "reason": "Nourishment and rest based on your schedule",
-        "type": "personal"
-    })
+    if wants_ndjson():
+        return stream_new_schedule(current_user.id, date_str, pending_tasks)
+
+    # Place every pending task around the user's fixed commitments
+    with SCHEDULE_GENERATION.time(endpoint='api_schedule', source='planner'):
+        plan = plan_day(profile_from_user(current_user), pending_tasks, datetime.strptime(date_str, "%Y-%m-%d").date())
+        schedule_data = standard_schedule_data(plan, len(pending_tasks))
     
-    # Afternoon work
-    afternoon_start = add_time(lunch_end, 60)
-    afternoon_end = add_time(afternoon_start, 90)
+    # Save schedule to database
+    upsert_schedules(current_user.id, {datetime.strptime(date_str, "%Y-%m-%d").date(): schedule_data})
     
-    schedule_items.append({
-        "time": f"{afternoon_start} - {afternoon_end}",
-        "task": "College/Work commitments",
-        "reason": "Scheduled college/work time based on your weekly schedule",
-        "type": "college/work"
-    })
+    return jsonify(schedule_data)
+
+def stream_saved_schedule(date_str, schedule_data):
+    def items():
+        yield from schedule_data.get("schedule", [])
+        return schedule_data
+
+    def finish(result):
+        yield summary_record(result)
+        yield {"type": "saved", "status": "existing", "date": date_str}
+
+    return ndjson_schedule_response(items(), finish)
+
+def stream_new_schedule(user_id, date_str, pending_tasks):
+    day = datetime.strptime(date_str, "%Y-%m-%d").date()
+    started = time.perf_counter()
+
+    def finish(schedule_data):
+        SCHEDULE_GENERATION.observe(time.perf_counter() - started, endpoint='api_schedule', source='planner')
+        yield summary_record(schedule_data)
+        upsert_schedules(user_id, {day: schedule_data})
+        yield {"type": "saved", "status": "success", "date": date_str}
+
+    items = iter_standard_schedule(profile_from_user(current_user), pending_tasks, day)
+    return ndjson_schedule_response(items, finish)
+
+@app.route('/api/schedule/batch', methods=['POST'])
+@login_required
+def api_schedule_batch():
+    data = request.json or {}
+    try:
+        start = datetime.strptime(data.get('from', get_today()), "%Y-%m-%d").date()
+        end = datetime.strptime(data.get('to', str(start)), "%Y-%m-%d").date()
+    except ValueError as e:
+        return jsonify({"error": "invalid_range", "message": str(e)}), 400
+    if end < start or (end - start).days >= MAX_BATCH_DAYS:
+        return jsonify({
+            "error": "invalid_range",
+            "message": f"'to' must be on or after 'from' and the range may cover at most {MAX_BATCH_DAYS} days"
+        }), 400
     
-    # Family time
-    family_time = current_user.family_time or "6:00 PM - 7:00 PM"
-    schedule_items.append({
-        "time": family_time,
-        "task": "Family time",
-        "reason": "Dedicated family time as per your preferences",
-        "type": "family"
-    })
+    if not current_user.name or not current_user.sleep_schedule:
+        return jsonify({
+            "error": "Profile incomplete",
+            "message": "Please complete your profile before generating a schedule. We need your wake up and sleep times to create an optimized schedule."
+        }), 400
     
-    # Workout time based on user preference
-    workout_pref = current_user.workout_preference or "evening"
-    workout_time = "7:00 PM - 8:00 PM"  # Default evening
-    if "morning" in workout_pref.lower():
-        workout_time = f"{add_time(wake_time, 30)} - {add_time(wake_time, 90)}"
+    pending_tasks = load_pending_tasks(current_user.id)
+    if not pending_tasks:
+        return jsonify({
+            "error": "No tasks",
+            "message": "Please add some tasks before generating a schedule. The AI needs tasks to optimize your day."
+        }), 400
     
-    schedule_items.append({
-        "time": workout_time,
-        "task": "Workout session",
-        "reason": f"{workout_pref.capitalize()} workout as per your preferences",
-        "type": "health"
-    })
+    # Profile and tasks are loaded once; tasks that don't fit roll over to the next day
+    plans = plan_days(profile_from_user(current_user), pending_tasks, date_range(start, end))
+    schedules = {plan.day: standard_schedule_data(plan, len(pending_tasks)) for plan in plans}
+    upsert_schedules(current_user.id, schedules)
     
-    # Evening review before bedtime
-    review_time_start = subtract_time(bedtime, 60)
-    schedule_items.append({
-        "time": f"{review_time_start} - {bedtime}",
-        "task": "Review and plan for tomorrow",
-        "reason": "Reflect on the day and prepare for tomorrow based on your bedtime",
-        "type": "personal"
+    return jsonify({
+        "status": "success",
+        "from": str(start),
+        "to": str(end),
+        "schedules": {str(day): schedule_data for day, schedule_data in schedules.items()}
     })
-    
-    # Create schedule data
-    schedule_data = {
-        "schedule": schedule_items,
-        "daily_summary": f"Personalized schedule based on your wake time ({wake_time}), bedtime ({bedtime}), and {len(pending_tasks)} pending tasks.",
-        "tips": [
-            "Take 5-min breaks every hour",
-            "Stay hydrated throughout the day",
-            "Maintain good posture while working"
-        ]
-    }
-    
-    # Save schedule to database
-    new_schedule = Schedule(
-        user_id=current_user.id,
-        date=datetime.strptime(date_str, "%Y-%m-%d").date(),
-        schedule_data=schedule_data
-    )
-    db.session.add(new_schedule)
-    db.session.commit()
-    
-    return jsonify(schedule_data)
 
 # Admin route
 @app.route('/admin')
@@ -604,8 +649,58 @@ def admin():
         flash('Access denied')
         return redirect(url_for('index'))
     
-    users = User.query.all()
-    return render_template('admin.html', users=users)
+    search = request.args.get('q', '').strip()
+    users, prev_cursor, next_cursor = page_users(
+        search=search or None,
+        after=request.args.get('after', type=int),
+        before=request.args.get('before', type=int),
+        limit=request.args.get('limit', ADMIN_PAGE_SIZE, type=int)
+    )
+    counts = user_activity_counts([user.id for user in users])
+    return render_template('admin.html', users=users, counts=counts, search=search,
+                           prev_cursor=prev_cursor, next_cursor=next_cursor)
+
+@app.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    if not current_user.is_admin:
+        return jsonify({"error": "forbidden", "message": "Access denied"}), 403
+    return jsonify(job_manager.stats())
+
+@app.route('/admin/metrics')
+@login_required
+def admin_metrics():
+    if not current_user.is_admin:
+        return jsonify({"error": "forbidden", "message": "Access denied"}), 403
+
+    gauges = {}
+    job_stats = job_manager.stats()
+    gauges['optimize_jobs'] = ("Optimization jobs by state", {
+        (("state", name),): job_stats[name] for name in ('submitted', 'done', 'failed', 'queued', 'running')
+    })
+    gauges['optimize_job_seconds'] = ("Recent job queue wait and run time percentiles", {
+        (("phase", phase), ("quantile", q)): job_stats[f'{phase}_p{int(q * 100)}_s']
+        for phase in ('queue_wait', 'run_time') for q in (0.5, 0.95)
+    })
+    cache = get_cache(app.config)
+    if cache:
+        cache_stats = cache.stats()
+        gauges['optimize_cache'] = ("Optimization cache counters", {
+            (("counter", name),): cache_stats[name]
+            for name in ('memory_hits', 'disk_hits', 'misses', 'evictions', 'invalidations', 'entries')
+        })
+        gauges['optimize_cache_hit_ratio'] = ("Optimization cache hit ratio", {(): cache_stats['hit_ratio']})
+    gauges['login_attempts'] = ("Failed and throttled sign-in attempts", {
+        (("outcome", name),): value for name, value in login_throttle.counters.items()
+    })
+    gauges['user_cache'] = ("Logged-in user cache counters", {
+        (("counter", name),): value for name, value in user_cache.stats().items()
+    })
+    if request_log:
+        gauges['request_log_records'] = ("Request log records by outcome", {
+            (("outcome", "written"),): request_log.written, (("outcome", "dropped"),): request_log.dropped
+        })
+    return Response(render_metrics(gauges), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,195 @@
+"""Password hashing off the request thread, and failed-login throttling.
+
+    init_password_hashing(app)          # from PASSWORD_HASH_* config
+    user.set_password(password)         # hashed in the worker pool
+    user.check_password(password)
+    hasher.needs_rehash(user.password_hash)
+
+werkzeug's password hashes are deliberately slow, so a burst of logins on
+request threads pins every core and starves the other endpoints. Hashes
+are computed on a small dedicated pool instead, which caps the CPU they
+can take. pbkdf2 and scrypt run inside OpenSSL with the GIL released, so
+pool threads hash in parallel with request threads and need no worker
+processes (which would re-import the server's __main__). The pool is
+bounded: when more hashes are waiting than it allows, HashingBusy is
+raised right away so the login page can answer 503 instead of queueing
+without limit.
+
+LoginThrottle counts failed attempts per account and per client address
+in a sliding window, so a throttled attempt is turned away before any
+hashing. Both live in the server process; with several processes each
+keeps its own counts.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'scrypt'  # werkzeug's own default, which the existing hashes use
+DEFAULT_QUEUE_PER_WORKER = 4
+DEFAULT_TIMEOUT_SECONDS = 10
+
+DEFAULT_MAX_ACCOUNT_FAILURES = 5
+DEFAULT_MAX_ADDRESS_FAILURES = 20
+DEFAULT_FAILURE_WINDOW_SECONDS = 15 * 60
+MAX_TRACKED_KEYS = 100000
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already waiting for the pool"""
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=0, queue_per_worker=DEFAULT_QUEUE_PER_WORKER,
+                 timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        # Hashes running plus waiting; beyond this callers get HashingBusy
+        self._slots = threading.BoundedSemaphore(max(1, workers * queue_per_worker)) if workers else None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash') if workers else None
+        self._canonical_method = None
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the hash finishes, not when a caller gives up on it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout as e:
+            raise HashingBusy() from e
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True when the configured method is stronger than the one pwhash was made with.
+
+        A weaker or equal configured method never rewrites a stored hash.
+        """
+        if self._canonical_method is None:
+            # werkzeug fills in defaults ('scrypt' -> 'scrypt:32768:8:1'); hash once, on the pool, to learn them
+            try:
+                self._canonical_method = self._run(generate_password_hash, '', self.method).split('$', 1)[0]
+            except HashingBusy:
+                return False  # try again at a later login
+        return hash_strength(self._canonical_method) > hash_strength((pwhash or '').split('$', 1)[0])
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_strength(method):
+    """(algorithm rank, work factor) of a werkzeug method such as 'scrypt:32768:8:1'; (0, 0) if unknown"""
+    name, *params = method.split(':')
+    try:
+        if name == 'scrypt':
+            n, r, p = (int(param) for param in params)
+            return 2, n * r * p
+        if name == 'pbkdf2':
+            return 1, int(params[1])
+    except (ValueError, IndexError):
+        pass
+    return 0, 0
+
+
+# Hashes inline until init_password_hashing configures a pool (scripts, CLIs)
+hasher = PasswordHasher()
+
+
+def hash_password(password):
+    return hasher.hash(password)
+
+
+def verify_password(pwhash, password):
+    return hasher.verify(pwhash, password)
+
+
+def init_password_hashing(app):
+    """Configure the shared hasher from PASSWORD_HASH_METHOD / _WORKERS / _QUEUE / _TIMEOUT"""
+    global hasher
+    hasher.shutdown()
+    hasher = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        queue_per_worker=app.config['PASSWORD_HASH_QUEUE'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+    )
+    atexit.register(hasher.shutdown)
+    return hasher
+
+
+def default_hash_workers():
+    return min(2, os.cpu_count() or 1)
+
+
+class LoginThrottle:
+    """Sliding-window counts of failed logins per account and per client address"""
+
+    def __init__(self, max_account_failures=DEFAULT_MAX_ACCOUNT_FAILURES,
+                 max_address_failures=DEFAULT_MAX_ADDRESS_FAILURES, window=DEFAULT_FAILURE_WINDOW_SECONDS):
+        self.limits = {'account': max_account_failures, 'address': max_address_failures}
+        self.window = window
+        self._failures = OrderedDict()  # (kind, key) -> deque of failure times
+        self._lock = threading.Lock()
+        self.counters = {'throttled': 0, 'failures': 0}
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, account, address):
+        """Seconds until another attempt is allowed, or 0 if it is allowed now"""
+        now = time.monotonic()
+        wait = 0
+        with self._lock:
+            for kind, key in (('account', (account or '').lower()), ('address', address)):
+                failures = self._recent((kind, key), now)
+                limit = self.limits[kind]
+                if failures and len(failures) >= limit:
+                    # Allowed again once enough of the recent failures age out of the window
+                    wait = max(wait, failures[-limit] + self.window - now)
+            if wait:
+                self.counters['throttled'] += 1
+        return int(wait) + 1 if wait else 0
+
+    def failed(self, account, address):
+        now = time.monotonic()
+        with self._lock:
+            self.counters['failures'] += 1
+            for key in (('account', (account or '').lower()), ('address', address)):
+                failures = self._recent(key, now)
+                if failures is None:
+                    failures = self._failures[key] = deque(maxlen=max(self.limits.values()))
+                failures.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > MAX_TRACKED_KEYS:
+                self._failures.popitem(last=False)
+
+    def succeeded(self, account):
+        with self._lock:
+            self._failures.pop(('account', (account or '').lower()), None)
@@ -0,0 +1,80 @@
+"""Micro-benchmark: integer time model vs the old strptime/strftime helpers.
+
+Run from the repository root:  python benchmarks/bench_time.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timeutil import parse_time, parse_time_range, add_minutes, format_time
+
+SAMPLES = ["7:00 AM", "5:30 AM", "10:30 PM", "19:00", "12:15 PM", "6:45 AM"]
+
+
+# Reference copies of the helpers app.py used before the integer time model
+def legacy_add_time(time_str, minutes):
+    try:
+        if "AM" in time_str.upper() or "PM" in time_str.upper():
+            time_obj = datetime.strptime(time_str.strip(), "%I:%M %p")
+        else:
+            time_obj = datetime.strptime(time_str.strip(), "%H:%M")
+        new_time = time_obj + timedelta(minutes=minutes)
+        if "AM" in time_str.upper() or "PM" in time_str.upper():
+            return new_time.strftime("%I:%M %p").lstrip('0')
+        else:
+            return new_time.strftime("%H:%M")
+    except:
+        return time_str
+
+
+def legacy_parse_time_str(time_str):
+    try:
+        if "AM" in time_str.upper() or "PM" in time_str.upper():
+            return datetime.strptime(time_str.strip(), "%I:%M %p")
+        return datetime.strptime(time_str.strip(), "%H:%M")
+    except:
+        return datetime.strptime("7:00 AM", "%I:%M %p")
+
+
+def legacy_day():
+    # Roughly the chain of calls the old generators made per schedule
+    t = SAMPLES[0]
+    for _ in range(12):
+        t = legacy_add_time(t, 45)
+    return t
+
+
+def integer_day():
+    t = parse_time(SAMPLES[0])
+    for _ in range(12):
+        t = add_minutes(t, 45)
+    return format_time(t)
+
+
+CASES = [
+    ("parse", lambda: [legacy_parse_time_str(s) for s in SAMPLES], lambda: [parse_time(s) for s in SAMPLES]),
+    ("add+format", lambda: [legacy_add_time(s, 90) for s in SAMPLES], lambda: [format_time(add_minutes(parse_time(s), 90)) for s in SAMPLES]),
+    ("range", lambda: [legacy_parse_time_str(p) for p in "6:30 PM - 7:00 PM".split(" - ")], lambda: parse_time_range("6:30 - 7:00 PM")),
+    ("day chain", legacy_day, integer_day),
+]
+
+
+def run(number=5000):
+    results = {}
+    for name, legacy, current in CASES:
+        legacy_s = min(timeit.repeat(legacy, number=number, repeat=3))
+        current_s = min(timeit.repeat(current, number=number, repeat=3))
+        results[name] = {
+            "legacy_us": legacy_s / number * 1e6,
+            "timeutil_us": current_s / number * 1e6,
+            "speedup": legacy_s / current_s if current_s else float('inf'),
+        }
+    return results
+
+
+if __name__ == '__main__':
+    for name, r in run().items():
+        print(f"{name:<12} legacy {r['legacy_us']:8.2f} us   timeutil {r['timeutil_us']:8.2f} us   x{r['speedup']:.1f}")
@@ -0,0 +1,173 @@
+"""Concurrent readers and writers against SQLite, default vs tuned settings.
+
+Run from the repository root:
+
+    python benchmarks/concurrency.py
+    python benchmarks/concurrency.py --readers 8 --writers 4 --seconds 10
+
+Each mode gets a fresh scratch database with the app's schema. Writer
+threads add tasks and mark them completed, one commit each, as
+POST /api/tasks does; reader threads load a user's task lists, as the
+task pages do. "default" is the engine as it was configured before
+database.py (rollback journal, no pragmas); "tuned" uses database.py's
+engine options and pragmas. The exit status is 1 if the tuned mode hit
+"database is locked".
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, select, update, insert, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from models import db, User, Task  # noqa: E402
+from database import engine_options, sqlite_pragmas, listen_sqlite_pragmas  # noqa: E402
+
+USERS = 20
+TASKS_PER_USER = 50
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def make_engine(path, tuned):
+    url = 'sqlite:///' + path
+    if not tuned:
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(url, {}))
+    listen_sqlite_pragmas(engine, sqlite_pragmas({}))
+    return engine
+
+
+def seed(engine):
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(User), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': '-'} for i in range(USERS)
+        ])
+        user_ids = session.execute(select(User.id)).scalars().all()
+        session.execute(insert(Task), [
+            {'user_id': user_id, 'description': f'Task {n}', 'priority': 'medium', 'priority_rank': 1,
+             'duration': '1h', 'duration_minutes': 60, 'type': 'study', 'status': 'pending'}
+            for user_id in user_ids for n in range(TASKS_PER_USER)
+        ])
+        session.commit()
+    return user_ids
+
+
+def run_mode(path, tuned, readers, writers, seconds, seed_value):
+    engine = make_engine(path, tuned)
+    user_ids = seed(engine)
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {'reads': [], 'writes': [], 'errors': 0}
+
+    def record(kind, started):
+        with lock:
+            stats[kind].append((time.perf_counter() - started) * 1000)
+
+    def failed():
+        with lock:
+            stats['errors'] += 1
+
+    def reader(rng):
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    session.execute(
+                        select(Task.id, Task.description, Task.status)
+                        .where(Task.user_id == rng.choice(user_ids), Task.status.in_(('pending', 'completed')))
+                        .order_by(Task.added_date, Task.id)
+                    ).all()
+                record('reads', started)
+            except OperationalError:
+                failed()
+
+    def writer(rng):
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    user_id = rng.choice(user_ids)
+                    session.execute(insert(Task), {'user_id': user_id, 'description': 'New task', 'priority': 'high',
+                                                   'duration': '30m', 'type': 'work', 'status': 'pending'})
+                    task_id = session.execute(
+                        select(Task.id).where(Task.user_id == user_id, Task.status == 'pending').limit(1)
+                    ).scalar()
+                    session.execute(update(Task).where(Task.id == task_id).values(status='completed'))
+                    session.commit()
+                record('writes', started)
+            except OperationalError:
+                failed()
+
+    rng = random.Random(seed_value)
+    threads = [threading.Thread(target=reader, args=(random.Random(rng.random()),)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(random.Random(rng.random()),)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text('PRAGMA journal_mode')).scalar()
+    engine.dispose()
+
+    result = {'journal_mode': journal_mode, 'errors': stats['errors']}
+    for kind in ('reads', 'writes'):
+        latencies = sorted(stats[kind])
+        result[kind] = {
+            'count': len(latencies),
+            'per_s': round(len(latencies) / seconds, 1),
+            'p50_ms': round(percentile(latencies, 0.5) or 0, 2),
+            'p95_ms': round(percentile(latencies, 0.95) or 0, 2),
+            'max_ms': round(latencies[-1], 2) if latencies else 0,
+        }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare SQLite reader/writer concurrency, default vs tuned')
+    parser.add_argument('--readers', type=int, default=4, help='reader threads')
+    parser.add_argument('--writers', type=int, default=2, help='writer threads')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each mode')
+    parser.add_argument('--seed', type=int, default=1234, help='random seed')
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='taskopt-concurrency-') as workdir:
+        for mode in ('default', 'tuned'):
+            results[mode] = run_mode(os.path.join(workdir, f'{mode}.db'), mode == 'tuned',
+                                     args.readers, args.writers, args.seconds, args.seed)
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s per mode\n")
+    for mode, result in results.items():
+        print(f"{mode:<8} journal={result['journal_mode']:<7} locked errors={result['errors']}")
+        for kind in ('reads', 'writes'):
+            stats = result[kind]
+            print(f"  {kind:<7} {stats['per_s']:>8.1f}/s  p50={stats['p50_ms']:>7.2f}ms  "
+                  f"p95={stats['p95_ms']:>7.2f}ms  max={stats['max_ms']:>8.2f}ms")
+
+    default, tuned = results['default'], results['tuned']
+    if default['writes']['per_s']:
+        print(f"\ntuned writes/s x{tuned['writes']['per_s'] / default['writes']['per_s']:.2f}, "
+              f"reads/s x{tuned['reads']['per_s'] / max(default['reads']['per_s'], 0.1):.2f}")
+    if tuned['errors']:
+        print(f"tuned mode hit {tuned['errors']} locked errors")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
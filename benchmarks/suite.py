@@ -0,0 +1,323 @@
+"""Reproducible benchmark suite: micro-benchmarks plus an in-process load run.
+
+Run from the repository root:
+
+    python benchmarks/suite.py --out results.json
+    python benchmarks/suite.py --users 200 --tasks 40 --clients 16 --baseline results.json
+
+Each run seeds a throwaway SQLite database (the real instance database is
+never touched), times the time helpers and the scheduler, then drives the
+Flask app with concurrent test clients that log in and hit /api/tasks,
+/api/schedule and /api/ai_optimize. Results are printed, optionally saved
+as JSON, and compared against a baseline file: any metric slower than the
+baseline by more than --threshold is reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TASK_PRIORITIES = ('high', 'medium', 'low')
+TASK_DURATIONS = ('30m', '45 minutes', '1h', '1.5 hours', '2h')
+TASK_TYPES = ('study', 'work', 'personal', 'health')
+PASSWORD = 'bench-password'
+LOGIN_ATTEMPTS = 10  # retries while the password hashing pool answers 503
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+def configure_environment(workdir, llm_provider):
+    """Point the app at a scratch database and keep telemetry out of the tree"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['OPTIMIZE_CACHE_PATH'] = os.path.join(workdir, 'optimize_cache.db')
+    os.environ['REQUEST_LOG_PATH'] = ''
+    os.environ['LLM_PROVIDER'] = llm_provider
+
+
+def seed(users, tasks_per_user, schedule_days, rng):
+    """Bulk-insert users, tasks and past schedules; returns the usernames"""
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from models import db, User, Task
+    from schedule_repository import bulk_upsert_schedules
+    from scheduler import plan_day, profile_from_user, standard_schedule_data, priority_rank
+    from timeutil import parse_duration_minutes
+
+    db.drop_all()
+    db.create_all()
+    password_hash = generate_password_hash(PASSWORD)  # one hash shared by every bench user
+    usernames = [f'bench{i}' for i in range(users)]
+    db.session.execute(insert(User), [{
+        'username': name,
+        'email': f'{name}@example.com',
+        'password_hash': password_hash,
+        'name': name.title(),
+        'role': 'student',
+        'peak_energy': rng.choice(['morning', 'afternoon', 'evening']),
+        'family_time': '6:30 - 7:30 PM',
+        'workout_preference': rng.choice(['morning', 'evening']),
+        'sleep_schedule': {'wake_time': '6:30 AM', 'bedtime': '10:30 PM'},
+        'weekly_schedule': {'Monday': {'start': '9:00 AM', 'end': '1:00 PM', 'type': 'college'}},
+    } for name in usernames])
+
+    user_ids = [row.id for row in db.session.execute(db.select(User.id).order_by(User.id))]
+    rows = []
+    for user_id in user_ids:
+        for i in range(tasks_per_user):
+            priority, duration = rng.choice(TASK_PRIORITIES), rng.choice(TASK_DURATIONS)
+            rows.append({
+                'user_id': user_id,
+                'description': f'Task {i}',
+                'priority': priority,
+                'priority_rank': priority_rank(priority),
+                'duration': duration,
+                'duration_minutes': parse_duration_minutes(duration),
+                'type': rng.choice(TASK_TYPES),
+                'status': 'completed' if rng.random() < 0.3 else 'pending',
+            })
+    if rows:
+        db.session.execute(insert(Task), rows)
+
+    if schedule_days and user_ids:
+        sample = db.session.get(User, user_ids[0])
+        schedule_data = standard_schedule_data(
+            plan_day(profile_from_user(sample), [{'description': 'Sample', 'duration': '1h', 'priority': 'high'}]), 1)
+        today = date.today()
+        bulk_upsert_schedules([
+            {'user_id': user_id, 'date': today - timedelta(days=d), 'schedule_data': schedule_data}
+            for user_id in user_ids for d in range(1, schedule_days + 1)
+        ])
+    db.session.commit()
+    return usernames
+
+
+def time_case(fn, number):
+    """Best-of-5 mean time per call in microseconds"""
+    runs = timeit.repeat(fn, number=number, repeat=5)
+    return {'mean_us': round(min(runs) / number * 1e6, 3), 'calls': number}
+
+
+def micro_benchmarks(rng):
+    from timeutil import parse_time, parse_time_range, parse_duration_minutes, format_time_range
+    from scheduler import plan_day, DEFAULT_WAKE
+    from optimize_cache import cache_key
+
+    profile = {
+        'sleep_schedule': {'wake_time': DEFAULT_WAKE, 'bedtime': '10:30 PM'},
+        'weekly_schedule': {'Monday': {'start': '9:00 AM', 'end': '1:00 PM'}},
+        'family_time': '6:30 - 7:30 PM', 'workout_preference': 'evening', 'peak_energy': 'morning',
+    }
+
+    def make_tasks(n):
+        return [{'id': i, 'description': f'Task {i}', 'priority': rng.choice(TASK_PRIORITIES),
+                 'duration': rng.choice(TASK_DURATIONS), 'type': 'study'} for i in range(n)]
+
+    tasks = {n: make_tasks(n) for n in (10, 100, 500)}
+    day = date(2026, 1, 5)
+
+    # Cached parsers are cleared between calls where the point is the cold path
+    cases = {
+        'parse_time_cached': (lambda: parse_time('10:30 PM'), 20000),
+        'parse_time_cold': (lambda: (parse_time.cache_clear(), parse_time('10:30 PM')), 5000),
+        'parse_time_range_cold': (lambda: (parse_time_range.cache_clear(), parse_time_range('6:30 - 7:00 PM')), 5000),
+        'parse_duration_cold': (lambda: (parse_duration_minutes.cache_clear(), parse_duration_minutes('1.5 hours')), 5000),
+        'format_time_range': (lambda: format_time_range(390, 1290), 20000),
+        'plan_day_10_tasks': (lambda: plan_day(profile, tasks[10], day), 500),
+        'plan_day_100_tasks': (lambda: plan_day(profile, tasks[100], day), 100),
+        'plan_day_500_tasks': (lambda: plan_day(profile, tasks[500], day), 20),
+        'cache_key_100_tasks': (lambda: cache_key(profile, tasks[100], 'focus on exams', day), 200),
+    }
+    return {name: time_case(fn, number) for name, (fn, number) in cases.items()}
+
+
+def load_run(app, usernames, clients, requests_per_client, rng):
+    """Concurrent test clients; returns per-endpoint latency stats"""
+    app.config['WTF_CSRF_ENABLED'] = False
+    samples = {}
+    lock = threading.Lock()
+    errors = []
+    today = date.today()
+
+    def record(name, started, response, ok=None):
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            entry = samples.setdefault(name, {'latencies': [], 'errors': 0})
+            entry['latencies'].append(elapsed)
+            if not (response.status_code < 500 if ok is None else ok):
+                entry['errors'] += 1
+
+    def client_loop(index, seed_value):
+        local_rng = random.Random(seed_value)
+        client = app.test_client()
+        username = usernames[index % len(usernames)]
+        try:
+            started = time.perf_counter()
+            for _ in range(LOGIN_ATTEMPTS):
+                response = client.post('/login', data={'username': username, 'password': PASSWORD})
+                if response.status_code != 503:
+                    break
+                # Hashing pool is full; back off as a browser retry would
+                time.sleep(float(response.headers.get('Retry-After', 1)))
+            # A successful login redirects; a re-rendered form means it failed
+            record('login', started, response, ok=response.status_code == 302)
+            for _ in range(requests_per_client):
+                choice = local_rng.random()
+                started = time.perf_counter()
+                if choice < 0.5:
+                    response = client.get('/api/tasks?limit=50')
+                    record('api_tasks', started, response)
+                elif choice < 0.8:
+                    day = today + timedelta(days=local_rng.randint(1, 14))
+                    response = client.post('/api/schedule', json={'date': str(day)})
+                    record('api_schedule', started, response)
+                else:
+                    day = today + timedelta(days=local_rng.randint(1, 3))
+                    response = client.post('/api/ai_optimize?sync=1',
+                                           json={'date': str(day), 'prompt': local_rng.choice(['', 'morning focus'])})
+                    record('api_ai_optimize', started, response)
+        except Exception as e:
+            with lock:
+                errors.append(f'client {index}: {type(e).__name__}: {e}')
+
+    threads = [threading.Thread(target=client_loop, args=(i, rng.random())) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name, entry in sorted(samples.items()):
+        latencies = sorted(entry['latencies'])
+        results[name] = {
+            'count': len(latencies),
+            'errors': entry['errors'],
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'max_ms': round(latencies[-1], 3),
+        }
+    total = sum(entry['count'] for entry in results.values())
+    return {'endpoints': results, 'requests': total, 'elapsed_s': round(elapsed, 3),
+            'requests_per_s': round(total / elapsed, 1) if elapsed else 0.0, 'client_errors': errors}
+
+
+# Metrics compared against a baseline; all are "lower is better". Changes
+# smaller than the noise floor in absolute terms never count as regressions.
+NOISE_FLOOR = {'us': 0.5, 'ms': 1.0}
+
+
+def comparable_metrics(results):
+    metrics = {f'micro.{name}.mean_us': case['mean_us'] for name, case in results.get('micro', {}).items()}
+    for name, stats in results.get('load', {}).get('endpoints', {}).items():
+        metrics[f'load.{name}.p50_ms'] = stats['p50_ms']
+        metrics[f'load.{name}.p95_ms'] = stats['p95_ms']
+    return metrics
+
+
+def compare(results, baseline, threshold):
+    """Return (rows, regressions) comparing results with a baseline"""
+    current, previous = comparable_metrics(results), comparable_metrics(baseline)
+    rows, regressions = [], []
+    for name in sorted(set(current) & set(previous)):
+        before, after = previous[name], current[name]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change))
+        if change > threshold and after - before > NOISE_FLOOR[name.rsplit('_', 1)[1]]:
+            regressions.append(name)
+    return rows, regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the time helpers, scheduler and web app')
+    parser.add_argument('--users', type=int, default=50, help='seeded users')
+    parser.add_argument('--tasks', type=int, default=20, help='seeded tasks per user')
+    parser.add_argument('--schedule-days', type=int, default=30, help='seeded past schedules per user')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent test clients')
+    parser.add_argument('--requests', type=int, default=50, help='requests per client after login')
+    parser.add_argument('--llm-provider', default='none', help="LLM_PROVIDER for the run: 'none' or 'stub'")
+    parser.add_argument('--seed', type=int, default=1234, help='random seed')
+    parser.add_argument('--skip-micro', action='store_true')
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--baseline', help='compare with a previous results JSON')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown vs baseline (0.25 = 25%%)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix='taskopt-bench-') as workdir:
+        configure_environment(workdir, args.llm_provider)
+        from app import app
+
+        results = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'params': {k: v for k, v in vars(args).items() if k not in ('out', 'baseline')},
+            },
+        }
+        with app.app_context():
+            started = time.perf_counter()
+            usernames = seed(args.users, args.tasks, args.schedule_days, rng)
+            results['meta']['seed_s'] = round(time.perf_counter() - started, 3)
+            if not args.skip_micro:
+                results['micro'] = micro_benchmarks(rng)
+        if not args.skip_load:
+            results['load'] = load_run(app, usernames, args.clients, args.requests, rng)
+
+    for name, case in results.get('micro', {}).items():
+        print(f"{name:<28} {case['mean_us']:>12.2f} us")
+    if 'load' in results:
+        load = results['load']
+        print(f"\n{load['requests']} requests in {load['elapsed_s']}s ({load['requests_per_s']} req/s)")
+        for name, stats in load['endpoints'].items():
+            print(f"{name:<16} n={stats['count']:<6} err={stats['errors']:<4} p50={stats['p50_ms']:>8.2f}ms "
+                  f"p95={stats['p95_ms']:>8.2f}ms p99={stats['p99_ms']:>8.2f}ms")
+        for error in load['client_errors']:
+            print(f"  {error}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(f"\nCompared with {args.baseline} ({baseline.get('meta', {}).get('git_revision')}):")
+        for name, before, after, change in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print(f"  {name:<40} {before:>10.2f} -> {after:>10.2f} ({change:+.1%}){flag}")
+        status = 1 if regressions else 0
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,180 @@
-from app import app, db, User
+import sys
+from sqlalchemy import inspect, select, text, update, or_
+from app import app
+from models import db, User, Task, Schedule, ScheduleItem
+from scheduler import priority_rank
+from timeutil import parse_duration_minutes
+from user_repository import prefix_match
+from schedule_repository import write_schedule_items
 
-with app.app_context():
+BACKFILL_BATCH_SIZE = 1000
+SCHEDULE_BACKUP_TABLE = 'schedule_duplicates_backup'
+
+
+def migrate():
+    """Bring an existing database up to the current schema without losing data"""
     db.create_all()
-    
-    # Create admin user if not exists
-    admin_user = User.query.filter_by(username='admin').first()
-    if not admin_user:
-        admin_user = User(username='admin', email='admin@example.com', is_admin=True)
-        admin_user.set_password('admin123')
-        db.session.add(admin_user)
+
+    dedupe_schedules()
+
+    # create_all() skips tables that already exist, so add any missing columns
+    inspector = inspect(db.engine)
+    for model in (Task, Schedule):
+        existing = {col['name'] for col in inspector.get_columns(model.__tablename__)}
+        for column in model.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(db.engine.dialect)
+                db.session.execute(text(
+                    f'ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}'
+                ))
+                print(f'Added column {model.__tablename__}.{column.name}')
+    db.session.commit()
+    backfill_task_normalized_fields()
+    migrate_schedule_items()
+
+    # ...and any missing indexes
+    for model in (User, Task, Schedule, ScheduleItem):
+        existing = existing_index_names(inspector, model.__tablename__)
+        for index in model.__table__.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                print(f'Created index {index.name}')
+
+
+def dedupe_schedules():
+    """Keep the newest schedule per (user, day) so the unique index can be built.
+
+    Older databases may hold several schedules for the same day. The older
+    copies are moved into schedule_duplicates_backup rather than dropped,
+    so an operator can still recover them.
+    """
+    duplicates = "id NOT IN (SELECT MAX(id) FROM schedule GROUP BY user_id, date)"
+    count = db.session.execute(text(f"SELECT COUNT(*) FROM schedule WHERE {duplicates}")).scalar()
+    if not count:
+        return
+    if not inspect(db.engine).has_table(SCHEDULE_BACKUP_TABLE):
+        db.session.execute(text(f"CREATE TABLE {SCHEDULE_BACKUP_TABLE} AS SELECT * FROM schedule WHERE 1 = 0"))
+    columns = ', '.join(col['name'] for col in inspect(db.engine).get_columns(SCHEDULE_BACKUP_TABLE))
+    db.session.execute(text(
+        f"INSERT INTO {SCHEDULE_BACKUP_TABLE} ({columns}) SELECT {columns} FROM schedule WHERE {duplicates}"
+    ))
+    db.session.execute(text(f"DELETE FROM schedule WHERE {duplicates}"))
+    db.session.commit()
+    print(f'Moved {count} duplicate schedules (older copies of the same day) into {SCHEDULE_BACKUP_TABLE}')
+
+
+def existing_index_names(inspector, table):
+    """Index names on a table; SQLite's reflection skips expression indexes, so ask it directly"""
+    if db.engine.dialect.name == 'sqlite':
+        return set(db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {'table': table}
+        ).scalars())
+    return {ix['name'] for ix in inspector.get_indexes(table)}
+
+
+def backfill_task_normalized_fields():
+    """Populate duration_minutes/priority_rank for rows written before they existed"""
+    stmt = (
+        select(Task.id, Task.duration, Task.priority)
+        .where(or_(Task.duration_minutes.is_(None), Task.priority_rank.is_(None)))
+        .order_by(Task.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    total = 0
+    while True:
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            break
+        db.session.execute(update(Task), [
+            {'id': row.id,
+             'duration_minutes': parse_duration_minutes(row.duration),
+             'priority_rank': priority_rank(row.priority)}
+            for row in rows
+        ])
         db.session.commit()
-        print('Database initialized and admin user created')
-    else:
-        print('Admin user already exists')
\ No newline at end of file
+        total += len(rows)
+    if total:
+        print(f'Backfilled duration/priority for {total} tasks')
+
+
+def migrate_schedule_items():
+    """Move the items of schedules saved as a single JSON document into schedule_item rows"""
+    stmt = (
+        select(Schedule.id, Schedule.user_id, Schedule.date, Schedule.schedule_data)
+        .order_by(Schedule.id)
+        .limit(BACKFILL_BATCH_SIZE)
+    )
+    last_id, total = 0, 0
+    while True:
+        rows = db.session.execute(stmt.where(Schedule.id > last_id)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        legacy = [row for row in rows if isinstance(row.schedule_data, dict) and 'schedule' in row.schedule_data]
+        if not legacy:
+            continue
+        headers = write_schedule_items([
+            {'user_id': row.user_id, 'date': row.date, 'schedule_data': row.schedule_data} for row in legacy
+        ])
+        db.session.execute(update(Schedule), [
+            {'id': row.id, 'schedule_data': header['schedule_data']} for row, header in zip(legacy, headers)
+        ])
+        db.session.commit()
+        total += len(legacy)
+    if total:
+        print(f'Moved the items of {total} schedules into schedule_item')
+
+
+def check_query_plans():
+    """Verify the hot-path queries are served by an index rather than a table scan"""
+    if db.engine.dialect.name != 'sqlite':
+        print('Query plan check is only available for SQLite')
+        return True
+
+    queries = {
+        'pending tasks': Task.query.filter_by(user_id=1, status='pending').order_by(Task.added_date),
+        'completed tasks': Task.query.filter_by(user_id=1, status='completed').order_by(Task.added_date),
+        'task page': Task.query.filter(Task.user_id == 1, Task.status == 'pending', Task.added_date > db.func.datetime('now'))
+                               .order_by(Task.added_date.asc().nulls_first(), Task.id).limit(51),
+        'task page, same date': Task.query.filter(Task.user_id == 1, Task.status == 'pending',
+                                                  Task.added_date == db.func.datetime('now'), Task.id > 1)
+                                          .order_by(Task.added_date.asc().nulls_first(), Task.id).limit(51),
+        'schedule by day': Schedule.query.filter_by(user_id=1, date=db.func.date('now')),
+        'schedule items by day': ScheduleItem.query.filter(ScheduleItem.user_id == 1,
+                                                           ScheduleItem.date.between(db.func.date('now', '-7 days'), db.func.date('now')))
+                                                   .order_by(ScheduleItem.date, ScheduleItem.position),
+        'schedule items by type': ScheduleItem.query.filter(ScheduleItem.user_id == 1, ScheduleItem.type == 'study'),
+        'admin user search': User.query.filter(or_(prefix_match(User.username, 'a'), prefix_match(User.email, 'a')))
+                                       .order_by(User.id).limit(51),
+    }
+
+    ok = True
+    with db.engine.connect() as conn:
+        for label, query in queries.items():
+            compiled = query.statement.compile(db.engine)
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+            plan = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+            details = [row[-1] for row in plan]
+            uses_index = any('USING' in d and 'INDEX' in d for d in details)
+            ok = ok and uses_index
+            print(f"[{'ok' if uses_index else 'SCAN'}] {label}: {'; '.join(details)}")
+    return ok
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        migrate()
+
+        # Create admin user if not exists
+        admin_user = User.query.filter_by(username='admin').first()
+        if not admin_user:
+            admin_user = User(username='admin', email='admin@example.com', is_admin=True)
+            admin_user.set_password('admin123')
+            db.session.add(admin_user)
+            db.session.commit()
+            print('Database initialized and admin user created')
+        else:
+            print('Admin user already exists')
+
+        if '--check-plans' in sys.argv[1:]:
+            sys.exit(0 if check_query_plans() else 1)
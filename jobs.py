@@ -0,0 +1,223 @@
+"""In-process background jobs with progress reporting.
+
+Request handlers enqueue work and return a job id straight away; a thread
+pool runs the job inside an app context and publishes progress, which
+clients follow over Server-Sent Events or by long-polling.
+
+The queue is bounded: past max_pending unfinished jobs in total, or
+max_pending_per_user for one user, submit() raises QueueFull instead of
+queueing, so a flood of requests cannot grow memory without limit.
+"""
+import json
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 100
+DEFAULT_MAX_PENDING_PER_USER = 3
+DEFAULT_RETENTION_SECONDS = 15 * 60
+LATENCY_SAMPLES = 500
+
+TERMINAL_STATES = ('done', 'failed')
+
+
+class JobFailed(Exception):
+    """Raised by a job to fail with a user-facing error code and message"""
+
+    def __init__(self, error, message):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+class QueueFull(Exception):
+    """Too many unfinished jobs, overall (scope 'global') or for one user (scope 'user')"""
+
+    def __init__(self, scope, retry_after):
+        super().__init__(f'Job queue full ({scope})')
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, user_id, kind):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = 0
+        self.message = 'Queued'
+        self.result = None
+        self.error = None
+        self.version = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        data = {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'version': self.version,
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        if self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class JobManager:
+    def __init__(self, app, max_workers=DEFAULT_WORKERS, retention=DEFAULT_RETENTION_SECONDS,
+                 max_pending=DEFAULT_MAX_PENDING, max_pending_per_user=DEFAULT_MAX_PENDING_PER_USER):
+        self.app = app
+        self.retention = retention
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self._queue_waits = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+        self._counts = {'submitted': 0, 'done': 0, 'failed': 0, 'rejected': 0}
+        self._pending = 0
+        self._pending_by_user = {}
+        self.max_workers = max_workers
+
+    def submit(self, user_id, kind, fn, *args):
+        """Queue fn(job, *args) and return the Job; fn runs inside an app context.
+
+        Raises QueueFull when the global or per-user pending cap is reached.
+        """
+        job = Job(user_id, kind)
+        with self._changed:
+            self._prune()
+            scope = None
+            if self._pending >= self.max_pending:
+                scope = 'global'
+            elif self._pending_by_user.get(user_id, 0) >= self.max_pending_per_user:
+                scope = 'user'
+            if scope:
+                self._counts['rejected'] += 1
+                raise QueueFull(scope, self._retry_after())
+            self._jobs[job.id] = job
+            self._pending += 1
+            self._pending_by_user[user_id] = self._pending_by_user.get(user_id, 0) + 1
+            self._counts['submitted'] += 1
+        self._pool.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id, user_id=None):
+        job = self._jobs.get(job_id)
+        if job is None or (user_id is not None and job.user_id != user_id):
+            return None
+        return job
+
+    def update(self, job, progress=None, message=None):
+        with self._changed:
+            if progress is not None:
+                job.progress = progress
+            if message is not None:
+                job.message = message
+            job.version += 1
+            self._changed.notify_all()
+
+    def wait(self, job, since_version, timeout):
+        """Block until the job changes past since_version or timeout expires"""
+        deadline = time.time() + timeout
+        with self._changed:
+            while job.version <= since_version and job.status not in TERMINAL_STATES:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._changed.wait(remaining)
+            return job.to_dict()
+
+    def events(self, job, heartbeat=15.0):
+        """Yield SSE-formatted progress events until the job finishes"""
+        version = -1
+        while True:
+            state = self.wait(job, version, heartbeat)
+            if state['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = state['version']
+            event = state['status'] if state['status'] in TERMINAL_STATES else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+            if event in TERMINAL_STATES:
+                return
+
+    def _run(self, job, fn, args):
+        with self._changed:
+            job.status = 'running'
+            job.started_at = time.time()
+        self.update(job, 5, 'Started')
+        try:
+            with self.app.app_context():
+                result = fn(job, *args)
+        except JobFailed as e:
+            self._finish(job, 'failed', error={'error': e.error, 'message': e.message})
+        except Exception as e:
+            self.app.logger.exception('Job %s failed', job.id)
+            self._finish(job, 'failed', error={'error': 'server_error', 'message': str(e)})
+        else:
+            self._finish(job, 'done', result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._changed:
+            job.status = status
+            job.result = result
+            job.error = error
+            job.progress = 100 if status == 'done' else job.progress
+            job.message = 'Done' if status == 'done' else (error or {}).get('message', 'Failed')
+            job.finished_at = time.time()
+            job.version += 1
+            self._counts[status] += 1
+            self._pending -= 1
+            remaining = self._pending_by_user.pop(job.user_id) - 1
+            if remaining:
+                self._pending_by_user[job.user_id] = remaining
+            self._queue_waits.append(job.started_at - job.created_at)
+            self._run_times.append(job.finished_at - job.started_at)
+            self._changed.notify_all()
+
+    def _retry_after(self):
+        """Seconds until a slot is likely free: the queue ahead divided among the workers"""
+        run_times = sorted(self._run_times)
+        typical = run_times[len(run_times) // 2] if run_times else 1.0
+        return max(1, math.ceil(typical * self._pending / self.max_workers))
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._changed:
+            statuses = [job.status for job in self._jobs.values()]
+            queue_waits = sorted(self._queue_waits)
+            run_times = sorted(self._run_times)
+            counts = dict(self._counts)
+
+        def pct(values, q):
+            return round(values[min(len(values) - 1, int(q * len(values)))], 4) if values else None
+
+        return dict(
+            counts,
+            workers=self.max_workers,
+            max_pending=self.max_pending,
+            max_pending_per_user=self.max_pending_per_user,
+            queued=statuses.count('queued'),
+            running=statuses.count('running'),
+            queue_wait_p50_s=pct(queue_waits, 0.5),
+            queue_wait_p95_s=pct(queue_waits, 0.95),
+            run_time_p50_s=pct(run_times, 0.5),
+            run_time_p95_s=pct(run_times, 0.95),
+        )
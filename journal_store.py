@@ -0,0 +1,173 @@
+"""Append-only storage for the CLI's JSON files.
+
+The CLI used to rewrite the whole of tasks_data.json on every change, so
+each added task cost O(history) and a crash mid-write could leave a
+truncated file. A JournalStore instead keeps:
+
+    tasks_data.json            snapshot, in exactly the format the CLI always wrote
+    tasks_data.json.journal    one JSON line per mutation since the snapshot
+
+Mutations append to the journal and are fsynced once per commit(), so a
+batch of added tasks costs one small write and one fsync. On load the
+snapshot is read and the journal replayed on top; a torn final line from
+a crash is dropped. Once the journal grows past a fraction of the snapshot
+it is compacted: the merged state is written to a temporary file, fsynced
+and renamed over the snapshot, and the journal is truncated. Every
+operation is idempotent, so a crash between those two steps replays
+harmlessly.
+
+A store belongs to one process at a time; there is no cross-process lock.
+"""
+import json
+import os
+
+DEFAULT_COMPACT_RATIO = 0.5
+MIN_COMPACT_BYTES = 64 * 1024
+
+
+def empty_tasks():
+    return {"pending": [], "completed": [], "schedules": {}}
+
+
+class JournalStore:
+    def __init__(self, path, default=dict, compact_ratio=DEFAULT_COMPACT_RATIO,
+                 min_compact_bytes=MIN_COMPACT_BYTES):
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.default = default
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self._journal = None
+        self._dirty = False
+        self.data = self._load()
+
+    # Loading
+
+    def _load(self):
+        data = self.default()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        self._index(data)
+        self.replayed = 0
+        good_until = 0
+        for op, end in iter_journal(self.journal_path):
+            self._apply(data, op)
+            good_until = end
+            self.replayed += 1
+        # Cut off a torn tail so new appends don't land after garbage
+        if os.path.exists(self.journal_path) and good_until < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_until)
+        return data
+
+    def _index(self, data):
+        self._task_ids = {task.get('id') for section in ('pending', 'completed')
+                          for task in data.get(section, []) if isinstance(task, dict)}
+
+    # Operations
+
+    def _apply(self, data, op):
+        kind = op.get('op')
+        if kind == 'replace':
+            new = dict(op['data'])  # op['data'] may be the live document itself
+            data.clear()
+            data.update(new)
+            self._index(data)
+        elif kind == 'add_task':
+            task = op['task']
+            if not task.get('id') or task['id'] not in self._task_ids:
+                data.setdefault('pending', []).append(task)
+                self._task_ids.add(task.get('id'))
+        else:
+            raise ValueError(f'Unknown journal operation {kind!r}')
+
+    def _append(self, op):
+        self._apply(self.data, op)
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps(op, separators=(',', ':')) + '\n')
+        self._dirty = True
+
+    def replace(self, data):
+        """Replace the whole document (small documents such as the profile)"""
+        self._append({'op': 'replace', 'data': data})
+
+    def add_task(self, task):
+        self._append({'op': 'add_task', 'task': task})
+
+    # Durability
+
+    def commit(self):
+        """Make every appended operation durable with a single fsync"""
+        if not self._dirty:
+            return
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._dirty = False
+        if self._should_compact():
+            self.compact()
+
+    def _should_compact(self):
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return journal_size >= max(self.min_compact_bytes, snapshot_size * self.compact_ratio)
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it"""
+        if self._journal is not None:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(self.path)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._dirty = False
+
+    def close(self, compact=True):
+        """Commit, and by default fold any journal into the snapshot"""
+        self.commit()
+        if compact and os.path.exists(self.journal_path):
+            self.compact()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def iter_journal(journal_path):
+    """Yield (operation, end_offset) for each complete journal line"""
+    if not os.path.exists(journal_path):
+        return
+    offset = 0
+    with open(journal_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                return  # torn write from a crash
+            try:
+                op = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield op, offset
+
+
+def _fsync_dir(path):
+    """Persist a rename; not supported (or needed) on Windows"""
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
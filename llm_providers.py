@@ -0,0 +1,338 @@
+"""LLM providers behind schedule optimization.
+
+A provider turns the optimizer prompt into a validated schedule dict:
+
+    provider = get_provider(app.config)       # or os.environ for the CLI
+    if provider:
+        schedule = provider.optimize(prompt)
+
+Providers are process-wide singletons so that HTTP connections are reused
+and a single semaphore bounds how many model calls run at once, however
+many web workers or CLI threads ask for one.
+"""
+import http.client
+import json
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from timeutil import parse_time_range, format_time_range
+
+DEFAULT_MODEL = 'claude-3-5-haiku-latest'
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_QUEUE_TIMEOUT = 10.0
+MAX_SCHEDULE_ITEMS = 64
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504, 529}
+
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+
+
+class ProviderError(Exception):
+    """The model could not be reached or returned an error"""
+
+
+class ProviderBusy(ProviderError):
+    """All concurrency slots stayed taken for longer than the queue timeout"""
+
+
+class ScheduleValidationError(ValueError):
+    """The model's reply was not a schedule in the expected shape"""
+
+
+def parse_schedule_response(text):
+    """Strictly parse and normalize a model reply into the schedule JSON shape"""
+    match = _JSON_BLOCK_RE.search(text or '')
+    raw = match.group(1) if match else (text or '').strip()
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        # Tolerate prose around a single top-level object, nothing more
+        start, end = raw.find('{'), raw.rfind('}')
+        if start == -1 or end <= start:
+            raise ScheduleValidationError('Reply contains no JSON object')
+        try:
+            data = json.loads(raw[start:end + 1])
+        except ValueError as e:
+            raise ScheduleValidationError(f'Reply is not valid JSON: {e}') from e
+
+    if not isinstance(data, dict):
+        raise ScheduleValidationError('Reply must be a JSON object')
+    items = data.get('schedule')
+    if not isinstance(items, list) or not items:
+        raise ScheduleValidationError("'schedule' must be a non-empty list")
+    if len(items) > MAX_SCHEDULE_ITEMS:
+        raise ScheduleValidationError(f"'schedule' has more than {MAX_SCHEDULE_ITEMS} items")
+
+    schedule = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ScheduleValidationError(f'schedule[{i}] must be an object')
+        for key in ('time', 'task'):
+            if not isinstance(item.get(key), str) or not item[key].strip():
+                raise ScheduleValidationError(f"schedule[{i}].{key} must be a non-empty string")
+        span = parse_time_range(item['time'])
+        if span is None:
+            raise ScheduleValidationError(f"schedule[{i}].time {item['time']!r} is not a time range")
+        schedule.append({
+            'time': format_time_range(*span),
+            'task': item['task'].strip(),
+            'reason': str(item.get('reason') or '').strip(),
+            'type': str(item.get('type') or 'personal').strip(),
+        })
+
+    tips = data.get('tips', [])
+    if not isinstance(tips, list) or not all(isinstance(t, str) for t in tips):
+        raise ScheduleValidationError("'tips' must be a list of strings")
+
+    schedule.sort(key=lambda it: parse_time_range(it['time']))
+    return {
+        'schedule': schedule,
+        'daily_summary': str(data.get('daily_summary') or '').strip(),
+        'tips': [t.strip() for t in tips if t.strip()],
+    }
+
+
+class LLMProvider(ABC):
+    """Base provider: concurrency limiting, validation and batch fan-out"""
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY, queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @abstractmethod
+    def complete(self, prompt):
+        """Return the raw model reply for a prompt"""
+
+    def optimize(self, prompt):
+        """Run one prompt through the model and return a validated schedule dict"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise ProviderBusy(f'No free model slot within {self.queue_timeout}s')
+        try:
+            reply = self.complete(prompt)
+        finally:
+            self._slots.release()
+        return parse_schedule_response(reply)
+
+    def optimize_many(self, prompts):
+        """Optimize several prompts concurrently; failures come back as exceptions in place"""
+        def run(prompt):
+            try:
+                return self.optimize(prompt)
+            except (ProviderError, ScheduleValidationError) as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(run, prompts))
+
+
+class AnthropicProvider(LLMProvider):
+    """Messages-API provider over persistent HTTP(S) connections.
+
+    Each thread keeps its own keep-alive connection, so repeated calls skip
+    the TCP/TLS handshake. Timeouts, 429/5xx replies and dropped
+    connections are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, base_url='https://api.anthropic.com', api_key='', model=DEFAULT_MODEL,
+                 timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, max_tokens=2048, **kwargs):
+        super().__init__(**kwargs)
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_tokens = max_tokens
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+            conn = cls(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def complete(self, prompt):
+        body = json.dumps({
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'messages': [{'role': 'user', 'content': prompt}],
+        })
+        headers = {
+            'content-type': 'application/json',
+            'x-api-key': self.api_key,
+            'anthropic-version': '2023-06-01',
+        }
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(8.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random()))
+            try:
+                conn = self._connection()
+                conn.request('POST', f'{self.path_prefix}/v1/messages', body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection()
+                last_error = ProviderError(f'Connection to model failed: {e}')
+                continue
+
+            if response.status in RETRYABLE_STATUSES:
+                last_error = ProviderError(f'Model returned HTTP {response.status}')
+                continue
+            if response.status != 200:
+                raise ProviderError(f'Model returned HTTP {response.status}: {payload[:200]!r}')
+            try:
+                message = json.loads(payload)
+                return ''.join(block.get('text', '') for block in message['content'] if block.get('type') == 'text')
+            except (ValueError, KeyError, TypeError) as e:
+                raise ProviderError(f'Malformed model response: {e}') from e
+        raise last_error
+
+
+def stub_reply(prompt):
+    """Deterministic schedule for a prompt, one hour per pending task from 9 AM"""
+    tasks = []
+    match = re.search(r"TODAY'S PENDING TASKS:\s*(\[.*?\])\s*\n\s*DATE:", prompt or '', re.DOTALL)
+    if match:
+        try:
+            tasks = json.loads(match.group(1))
+        except ValueError:
+            tasks = []
+    schedule = [
+        {
+            'time': format_time_range(9 * 60 + 60 * i, 9 * 60 + 60 * (i + 1)),
+            'task': task.get('description', 'Task'),
+            'reason': 'Stub provider: tasks in priority order',
+            'type': task.get('type') or 'work',
+        }
+        for i, task in enumerate(tasks[:12])
+    ] or [{'time': '9:00 AM - 10:00 AM', 'task': 'Plan the day', 'reason': 'No tasks in prompt', 'type': 'personal'}]
+    return json.dumps({
+        'schedule': schedule,
+        'daily_summary': f'Stub schedule for {len(tasks)} tasks',
+        'tips': ['Generated by the local stub provider'],
+    })
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('content-length', 0))
+        try:
+            request = json.loads(self.rfile.read(length))
+            prompt = request['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.send_response(400)
+            self.send_header('content-length', '0')
+            self.end_headers()
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({'content': [{'type': 'text', 'text': stub_reply(prompt)}]}).encode()
+        self.send_response(200)
+        self.send_header('content-type', 'application/json')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Local Messages-API lookalike for tests and load runs.
+
+        with StubServer(latency=0.2) as server:
+            provider = AnthropicProvider(base_url=server.url)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class LocalStubProvider(LLMProvider):
+    """In-process stub that needs no server at all"""
+
+    def complete(self, prompt):
+        return stub_reply(prompt)
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(config):
+    """Return the shared provider described by a config mapping, or None.
+
+    Reads LLM_PROVIDER ('none', 'stub' or 'anthropic'), LLM_API_URL,
+    LLM_API_KEY, LLM_MODEL, LLM_TIMEOUT, LLM_MAX_RETRIES,
+    LLM_MAX_CONCURRENCY and LLM_QUEUE_TIMEOUT. Works with app.config and
+    os.environ alike.
+    """
+    kind = (config.get('LLM_PROVIDER') or 'none').lower()
+    if kind == 'none':
+        return None
+    key = (kind, config.get('LLM_API_URL'), config.get('LLM_MODEL'))
+    with _providers_lock:
+        if key not in _providers:
+            common = {
+                'max_concurrency': int(config.get('LLM_MAX_CONCURRENCY') or DEFAULT_MAX_CONCURRENCY),
+                'queue_timeout': float(config.get('LLM_QUEUE_TIMEOUT') or DEFAULT_QUEUE_TIMEOUT),
+            }
+            if kind == 'stub':
+                _providers[key] = LocalStubProvider(**common)
+            elif kind == 'anthropic':
+                _providers[key] = AnthropicProvider(
+                    base_url=config.get('LLM_API_URL') or 'https://api.anthropic.com',
+                    api_key=config.get('LLM_API_KEY') or '',
+                    model=config.get('LLM_MODEL') or DEFAULT_MODEL,
+                    timeout=float(config.get('LLM_TIMEOUT') or DEFAULT_TIMEOUT),
+                    max_retries=int(config.get('LLM_MAX_RETRIES') or DEFAULT_MAX_RETRIES),
+                    **common
+                )
+            else:
+                raise ValueError(f'Unknown LLM_PROVIDER {kind!r}')
+        return _providers[key]
@@ -0,0 +1,160 @@
+"""In-memory histograms exposed in Prometheus text format.
+
+    init_metrics(app)                                  # request, DB and template timings
+    with SCHEDULE_GENERATION.time(endpoint='api_schedule', source='planner'):
+        ...
+    render_metrics(gauges)                             # body for /admin/metrics
+
+Histograms keep cumulative bucket counts per label set, so observing is a
+bisect and two additions under a lock and memory does not grow with
+traffic.
+"""
+import bisect
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, template_rendered, before_render_template
+from flask_login import current_user
+from telemetry import init_request_timing, request_timings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[i] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(labels + [("le", bound)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {values[-1]:.6f}')
+            lines.append(f'{self.name}_count{_labels(labels)} {cumulative}')
+        return lines
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+REGISTRY = []
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time to produce a response',
+                             ('endpoint', 'method', 'status'))
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Time spent in SQL per request', ('endpoint',))
+REQUEST_DB_QUERIES = Histogram('http_request_db_queries', 'SQL statements per request', ('endpoint',),
+                               buckets=COUNT_BUCKETS)
+TEMPLATE_RENDER = Histogram('template_render_seconds', 'Jinja render time', ('template',))
+SCHEDULE_GENERATION = Histogram('schedule_generation_seconds', 'Time to generate one schedule',
+                                ('endpoint', 'source'))
+
+
+def render_metrics(gauges=None):
+    """Prometheus text exposition of every histogram plus {name: (help, {labels: value})} gauges"""
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    for name, (help, samples) in sorted((gauges or {}).items()):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples.items():
+            if value is not None:
+                lines.append(f'{name}{_labels(list(labels))} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Record request, DB and template timings for every request"""
+    init_request_timing(app)
+
+    @app.after_request
+    def observe_request(response):
+        timings = request_timings()
+        if timings is not None:
+            latency_ms, db_ms, db_queries = timings
+            endpoint = request.endpoint or 'unmatched'
+            REQUEST_DURATION.observe(latency_ms / 1000, endpoint=endpoint, method=request.method,
+                                     status=response.status_code)
+            REQUEST_DB_TIME.observe(db_ms / 1000, endpoint=endpoint)
+            REQUEST_DB_QUERIES.observe(db_queries, endpoint=endpoint)
+        return response
+
+    def render_started(sender, template, context, **extra):
+        g.setdefault('template_started', {})[template.name] = time.perf_counter()
+
+    def render_finished(sender, template, context, **extra):
+        started = g.get('template_started', {}).pop(template.name, None)
+        if started is not None:
+            TEMPLATE_RENDER.observe(time.perf_counter() - started, template=template.name)
+
+    before_render_template.connect(render_started, app, weak=False)
+    template_rendered.connect(render_finished, app, weak=False)
+
+
+def init_profiler(app, directory):
+    """Opt-in cProfile dumps for single requests.
+
+    When enabled, an admin request carrying ?profile=1 (or an X-Profile: 1
+    header) runs under cProfile and the stats are dumped to directory; the
+    response names the file in X-Profile-File. Load it with pstats or
+    snakeviz. Streamed bodies are profiled only up to the first byte.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    @app.before_request
+    def start_profiler():
+        if request.args.get('profile') != '1' and request.headers.get('X-Profile') != '1':
+            return
+        if not (current_user.is_authenticated and current_user.is_admin):
+            return
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.after_request
+    def dump_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        path = os.path.join(directory, f'{time.strftime("%Y%m%d-%H%M%S")}-{request.endpoint}-{os.getpid()}-'
+                                       f'{threading.get_ident()}.prof')
+        profiler.dump_stats(path)
+        response.headers['X-Profile-File'] = path
+        return response
@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from auth import hash_password, verify_password
 from datetime import datetime
+from scheduler import priority_rank
+from timeutil import parse_duration_minutes
 
 db = SQLAlchemy()
 
@@ -9,7 +11,8 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    # Only login and registration need the hash
+    password_hash = db.deferred(db.Column(db.String(120), nullable=False), group='credentials')
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -22,19 +25,26 @@ class User(UserMixin, db.Model):
     family_time = db.Column(db.String(50))
     workout_preference = db.Column(db.String(20))
     workout_impact = db.Column(db.String(20))
-    main_goals = db.Column(db.Text)
-    sleep_schedule = db.Column(db.JSON)
-    weekly_schedule = db.Column(db.JSON)
+    # Loaded together on first access; most requests only need identity fields
+    main_goals = db.deferred(db.Column(db.Text), group='profile')
+    sleep_schedule = db.deferred(db.Column(db.JSON), group='profile')
+    weekly_schedule = db.deferred(db.Column(db.JSON), group='profile')
     
     # Relationship with tasks
     tasks = db.relationship('Task', backref='user', lazy=True)
     schedules = db.relationship('Schedule', backref='user', lazy=True)
     
+    # The admin list searches by case-insensitive username/email prefix
+    __table_args__ = (
+        db.Index('ix_user_username_lower', db.func.lower(username)),
+        db.Index('ix_user_email_lower', db.func.lower(email)),
+    )
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -51,6 +61,30 @@ class Task(db.Model):
     added_date = db.Column(db.DateTime, default=datetime.utcnow)
     completed_date = db.Column(db.DateTime)
     
+    # Normalized copies of duration/priority so SQL and the scheduler can
+    # sort and pack with integers; kept in sync by the validators below
+    duration_minutes = db.Column(db.Integer)
+    priority_rank = db.Column(db.Integer)
+    
+    # Id the task had in the CLI's tasks_data.json; imports upsert on it
+    external_id = db.Column(db.String(64))
+    
+    # Every listing filters by (user_id, status) and orders by added_date
+    __table_args__ = (
+        db.Index('ix_task_user_status_added', 'user_id', 'status', 'added_date'),
+        db.Index('uq_task_user_external', 'user_id', 'external_id', unique=True),
+    )
+    
+    @db.validates('duration')
+    def _sync_duration_minutes(self, key, value):
+        self.duration_minutes = parse_duration_minutes(value)
+        return value
+    
+    @db.validates('priority')
+    def _sync_priority_rank(self, key, value):
+        self.priority_rank = priority_rank(value)
+        return value
+    
     def __repr__(self):
         return f'<Task {self.description}>'
 
@@ -61,5 +95,43 @@ class Schedule(db.Model):
     schedule_data = db.Column(db.JSON, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # One schedule per user per day; also serves the (user_id, date) lookups
+    __table_args__ = (
+        db.Index('uq_schedule_user_date', 'user_id', 'date', unique=True),
+    )
+    
+    def __repr__(self):
+        return f'<Schedule {self.date}>'
+
+class ScheduleItem(db.Model):
+    """One block of a saved schedule.
+
+    Schedule.schedule_data keeps the day-level fields (summary, tips,
+    unscheduled); its "schedule" list is rebuilt from these rows (see
+    schedule_repository.schedule_view), so questions across days can be
+    answered in SQL.
+    """
+    __tablename__ = 'schedule_item'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    # Minutes since midnight; end_minute passes 1440 for blocks that run past midnight
+    start_minute = db.Column(db.Integer)
+    end_minute = db.Column(db.Integer)
+    type = db.Column(db.String(50))
+    task_id = db.Column(db.Integer, db.ForeignKey('task.id', ondelete='SET NULL'))
+    task = db.Column(db.Text)
+    reason = db.Column(db.Text)
+    # The original "time" text, kept only when it isn't the canonical rendering of the minutes
+    time_text = db.Column(db.String(64))
+    # Any other keys the item carried
+    extra = db.Column(db.JSON)
+    
+    __table_args__ = (
+        db.Index('ix_schedule_item_user_date', 'user_id', 'date', 'position'),
+        db.Index('ix_schedule_item_user_type', 'user_id', 'type', 'date'),
+    )
+    
     def __repr__(self):
-        return f'<Schedule {self.date}>'
\ No newline at end of file
+        return f'<ScheduleItem {self.date} #{self.position}>'
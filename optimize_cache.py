@@ -0,0 +1,157 @@
+"""Result cache for schedule optimization.
+
+Entries are content-addressed: the key hashes everything that can change
+the result (profile fields, the pending task set and each task's content,
+the prompt and the date), so an edited profile or task simply misses.
+invalidate_user() additionally drops a user's stale entries as soon as
+their data changes, so they don't linger until TTL.
+
+Two tiers: an in-process LRU, and an optional SQLite file shared by all
+workers on the host.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+PROFILE_KEY_FIELDS = (
+    'role', 'peak_energy', 'study_preference', 'family_time', 'workout_preference',
+    'workout_impact', 'main_goals', 'sleep_schedule', 'weekly_schedule',
+)
+TASK_KEY_FIELDS = ('description', 'priority', 'duration', 'type', 'preferences')
+
+
+def _field(task, name):
+    return task.get(name) if isinstance(task, dict) else getattr(task, name, None)
+
+
+def cache_key(profile, pending_tasks, prompt, day):
+    """Stable hash of every input that affects an optimization result"""
+    tasks = sorted(
+        (str(_field(task, 'id')), hashlib.sha1(json.dumps(
+            [_field(task, name) for name in TASK_KEY_FIELDS], default=str).encode()).hexdigest())
+        for task in pending_tasks
+    )
+    payload = {
+        'profile': {name: profile.get(name) for name in PROFILE_KEY_FIELDS},
+        'tasks': tasks,
+        'prompt': ' '.join((prompt or '').split()),
+        'date': str(day),
+        'weekday': day.strftime('%A'),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class OptimizeCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        if path:
+            with self._db() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS optimize_cache ('
+                    'key TEXT PRIMARY KEY, user_id INTEGER NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS ix_optimize_cache_user ON optimize_cache (user_id)')
+
+    def _db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry[2]
+            if entry:
+                del self._entries[key]
+
+        if self.path:
+            row = self._db().execute(
+                'SELECT user_id, value, expires_at FROM optimize_cache WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row:
+                value = json.loads(row[1])
+                self._remember(key, row[0], value, row[2])
+                self._count('disk_hits')
+                return value
+
+        self._count('misses')
+        return None
+
+    def set(self, key, user_id, value):
+        expires_at = time.time() + self.ttl
+        self._remember(key, user_id, value, expires_at)
+        if self.path:
+            with self._db() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO optimize_cache (key, user_id, value, expires_at) VALUES (?, ?, ?, ?)',
+                    (key, user_id, json.dumps(value), expires_at)
+                )
+
+    def _remember(self, key, user_id, value, expires_at):
+        with self._lock:
+            self._entries[key] = (expires_at, user_id, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached result for a user after their profile or tasks change"""
+        with self._lock:
+            for key in [k for k, entry in self._entries.items() if entry[1] == user_id]:
+                del self._entries[key]
+            self.counters['invalidations'] += 1
+        if self.path:
+            with self._db() as conn:
+                conn.execute('DELETE FROM optimize_cache WHERE user_id = ? OR expires_at <= ?',
+                             (user_id, time.time()))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters, entries=len(self._entries))
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(config):
+    """Shared cache for a config mapping (OPTIMIZE_CACHE_SIZE/_TTL/_PATH), or None if disabled"""
+    size = int(config.get('OPTIMIZE_CACHE_SIZE') or DEFAULT_MAX_ENTRIES)
+    if size <= 0:
+        return None
+    ttl = float(config.get('OPTIMIZE_CACHE_TTL') or DEFAULT_TTL_SECONDS)
+    path = config.get('OPTIMIZE_CACHE_PATH') or None
+    key = (size, ttl, path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = OptimizeCache(size, ttl, path)
+        return _caches[key]
@@ -0,0 +1,87 @@
+from llm_providers import get_provider, ProviderError, ScheduleValidationError
+from optimize_cache import get_cache, cache_key
+from scheduler import DayPlan, place_blocks, build_schedule_data, parse_prompt_hints
+from task_repository import pending_task_to_dict
+from tracker import build_ai_prompt
+
+PLANNER_TIPS = [
+    "Use high-energy blocks for deep work",
+    "Take short breaks every hour",
+    "Hydrate and move regularly"
+]
+
+
+def optimize_schedule(profile, pending_tasks, day, prompt, config, logger=None, user_id=None):
+    """Produce the AI-optimized schedule for one day.
+
+    Uses the configured LLM provider when there is one and falls back to
+    the local planner if it is unavailable or replies with something that
+    is not a valid schedule. Results are cached per user on a hash of all
+    inputs; a planner fallback caused by a provider failure is not cached.
+    Returns (schedule_data, source, cached) where source is 'llm' or
+    'planner'.
+    """
+    return drain(iter_optimize_schedule(profile, pending_tasks, day, prompt, config, logger, user_id))
+
+
+def iter_optimize_schedule(profile, pending_tasks, day, prompt, config, logger=None, user_id=None):
+    """Generator form of optimize_schedule.
+
+    Yields schedule items as they become available - block by block from
+    the planner, all at once after a cache hit or a model reply - and
+    returns (schedule_data, source, cached) when exhausted.
+    """
+    cache = get_cache(config) if user_id is not None else None
+    key = cache_key(profile, pending_tasks, prompt, day) if cache else None
+    if cache:
+        hit = cache.get(key)
+        if hit is not None:
+            yield from hit['schedule']['schedule']
+            return hit['schedule'], hit['source'], True
+
+    provider = get_provider(config)
+    if provider:
+        ai_prompt = build_ai_prompt(profile, [pending_task_to_dict(t) for t in pending_tasks], str(day), prompt)
+        try:
+            schedule_data = provider.optimize(ai_prompt)
+        except (ProviderError, ScheduleValidationError) as e:
+            if logger:
+                logger.warning('LLM optimization failed, falling back to planner: %s', e)
+            schedule_data = yield from _iter_planner_schedule(profile, pending_tasks, day, prompt)
+            return schedule_data, 'planner', False
+        if cache:
+            cache.set(key, user_id, {'schedule': schedule_data, 'source': 'llm'})
+        yield from schedule_data['schedule']
+        return schedule_data, 'llm', False
+
+    schedule_data = yield from _iter_planner_schedule(profile, pending_tasks, day, prompt)
+    if cache:
+        cache.set(key, user_id, {'schedule': schedule_data, 'source': 'planner'})
+    return schedule_data, 'planner', False
+
+
+def _iter_planner_schedule(profile, pending_tasks, day, prompt):
+    plan = DayPlan.for_profile(profile, day)
+    for block in place_blocks(plan, profile, pending_tasks, parse_prompt_hints(prompt)):
+        yield DayPlan.item(block)
+    return build_schedule_data(
+        plan,
+        f"Optimized using profile and {len(pending_tasks)} tasks. Prompt: {prompt}",
+        list(PLANNER_TIPS)
+    )
+
+
+def drain(items):
+    """Run an item generator to the end and return its return value"""
+    while True:
+        try:
+            next(items)
+        except StopIteration as done:
+            return done.value
+
+
+def invalidate_user(config, user_id):
+    """Forget cached optimizations after a user's profile or tasks change"""
+    cache = get_cache(config)
+    if cache:
+        cache.invalidate_user(user_id)
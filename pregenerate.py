@@ -0,0 +1,168 @@
+"""Pre-generate schedules for every user, e.g. from a nightly cron job.
+
+    python pregenerate.py                      # tomorrow, all users
+    python pregenerate.py --date 2026-01-05 --workers 8 --chunk-size 1000
+
+Users are streamed from the database in id order, one chunk at a time.
+Each chunk is planned in a worker process and written back with a batched
+upsert, so memory stays bounded by chunk size x in-flight chunks no matter
+how many users there are.
+
+The app is imported only in main(): importing it starts its background
+threads (request log writer, job pool, password-hash pool), which must
+not be running when worker processes are created. Workers are spawned
+rather than forked and need nothing beyond the planner.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import db, User, Task, Schedule
+from schedule_repository import bulk_upsert_schedules
+from scheduler import plan_day, profile_from_user, standard_schedule_data
+
+MAX_REPORTED_FAILURES = 100
+
+PROFILE_COLUMNS = (
+    User.id, User.name, User.role, User.peak_energy, User.family_time,
+    User.workout_preference, User.sleep_schedule, User.weekly_schedule,
+)
+TASK_COLUMNS = (
+    Task.user_id, Task.id, Task.description, Task.priority, Task.duration,
+    Task.type, Task.duration_minutes, Task.priority_rank,
+)
+
+
+def iter_user_chunks(chunk_size):
+    """Yield lists of profile rows, keyset-paginated by user id"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*PROFILE_COLUMNS).where(User.id > last_id).order_by(User.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def build_chunk_payload(rows, day, overwrite):
+    """Turn profile rows into plain picklable jobs, skipping users with nothing to plan"""
+    user_ids = [row.id for row in rows]
+    tasks_by_user = defaultdict(list)
+    for task in db.session.execute(
+        select(*TASK_COLUMNS)
+        .where(Task.user_id.in_(user_ids), Task.status == 'pending')
+        .order_by(Task.user_id, Task.priority_rank, Task.duration_minutes.desc(), Task.id)
+    ):
+        tasks_by_user[task.user_id].append(dict(task._mapping))
+
+    already_done = set()
+    if not overwrite:
+        already_done = set(db.session.execute(
+            select(Schedule.user_id).where(Schedule.user_id.in_(user_ids), Schedule.date == day)
+        ).scalars())
+
+    jobs, skipped = [], 0
+    for row in rows:
+        if row.id in already_done or not row.name or not row.sleep_schedule or not tasks_by_user[row.id]:
+            skipped += 1
+            continue
+        jobs.append((row.id, profile_from_user(row), tasks_by_user[row.id]))
+    return jobs, skipped
+
+
+def plan_chunk(jobs, day):
+    """Worker entry point: plan one chunk, returning (user_id, schedule_data, error) triples"""
+    results = []
+    for user_id, profile, tasks in jobs:
+        try:
+            plan = plan_day(profile, tasks, day)
+            results.append((user_id, standard_schedule_data(plan, len(tasks)), None))
+        except Exception as e:
+            results.append((user_id, None, f'{type(e).__name__}: {e}'))
+    return results
+
+
+def run(day, chunk_size=500, workers=None, commit_every=2000, overwrite=False, max_in_flight=None):
+    stats = {'users': 0, 'generated': 0, 'skipped': 0, 'failed': 0}
+    failures = []
+    pending_rows = []
+    started = time.perf_counter()
+
+    def flush():
+        if pending_rows:
+            bulk_upsert_schedules(pending_rows)
+            pending_rows.clear()
+
+    def collect(done):
+        for future in done:
+            for user_id, schedule_data, error in future.result():
+                if error:
+                    stats['failed'] += 1
+                    if len(failures) < MAX_REPORTED_FAILURES:
+                        failures.append((user_id, error))
+                    continue
+                stats['generated'] += 1
+                pending_rows.append({'user_id': user_id, 'date': day, 'schedule_data': schedule_data})
+            if len(pending_rows) >= commit_every:
+                flush()
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        in_flight = set()
+        for rows in iter_user_chunks(chunk_size):
+            stats['users'] += len(rows)
+            jobs, skipped = build_chunk_payload(rows, day, overwrite)
+            stats['skipped'] += skipped
+            if jobs:
+                in_flight.add(pool.submit(plan_chunk, jobs, day))
+            # Backpressure: don't read further ahead than the pool can work
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        done, _ = wait(in_flight)
+        collect(done)
+    flush()
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed_s'] = round(elapsed, 2)
+    stats['users_per_s'] = round(stats['users'] / elapsed, 1) if elapsed else 0.0
+    return stats, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pre-generate schedules for all users')
+    parser.add_argument('--date', help='YYYY-MM-DD (default: tomorrow)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='users loaded and planned per batch')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--commit-every', type=int, default=2000, help='schedules written per transaction')
+    parser.add_argument('--overwrite', action='store_true', help='replace schedules that already exist')
+    args = parser.parse_args(argv)
+
+    day = (datetime.strptime(args.date, "%Y-%m-%d").date() if args.date
+           else datetime.now().date() + timedelta(days=1))
+
+    from app import app
+    with app.app_context():
+        stats, failures = run(day, args.chunk_size, args.workers, args.commit_every, args.overwrite)
+
+    print(f"Schedules for {day}: {stats['generated']} generated, {stats['skipped']} skipped, "
+          f"{stats['failed']} failed out of {stats['users']} users "
+          f"in {stats['elapsed_s']}s ({stats['users_per_s']} users/s)")
+    for user_id, error in failures[:20]:
+        print(f"  user {user_id}: {error}")
+    if stats['failed'] > 20:
+        print(f"  ... and {stats['failed'] - 20} more")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
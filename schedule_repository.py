@@ -0,0 +1,255 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, bindparam
+from models import db, Schedule, ScheduleItem, Task
+from timeutil import parse_time_range, format_time_range
+
+# Days either side of the focus date that a page renders up front
+WINDOW_BEFORE_DAYS = 7
+WINDOW_AFTER_DAYS = 7
+
+# Upper bound on a single range request so one call can't decode a year of blobs
+MAX_RANGE_DAYS = 92
+
+# Upper bound on days generated by one batch request
+MAX_BATCH_DAYS = 31
+
+# Aggregates run in SQL over schedule_item, so they can cover a longer span
+MAX_SUMMARY_DAYS = 366
+
+# Item keys stored in their own schedule_item columns; anything else goes to extra
+ITEM_TEXT_COLUMNS = {'task': None, 'reason': None, 'type': 50}
+
+ITEM_COLUMNS = (
+    ScheduleItem.date,
+    ScheduleItem.start_minute,
+    ScheduleItem.end_minute,
+    ScheduleItem.type,
+    ScheduleItem.task_id,
+    ScheduleItem.task,
+    ScheduleItem.reason,
+    ScheduleItem.time_text,
+    ScheduleItem.extra,
+)
+
+
+def window_around(day):
+    """Default (start, end) window the schedule pages load for a focus date"""
+    return day - timedelta(days=WINDOW_BEFORE_DAYS), day + timedelta(days=WINDOW_AFTER_DAYS)
+
+
+def split_schedule(schedule_data):
+    """(day-level fields, items) of a schedule JSON document"""
+    header = {key: value for key, value in schedule_data.items() if key != 'schedule'}
+    return header, schedule_data.get('schedule') or []
+
+
+def item_row(user_id, day, position, item, owned_task_ids=frozenset()):
+    """schedule_item column values for one schedule JSON item"""
+    row = {'user_id': user_id, 'date': day, 'position': position, 'start_minute': None, 'end_minute': None,
+           'type': None, 'task_id': None, 'task': None, 'reason': None, 'time_text': None, 'extra': None}
+    if not isinstance(item, dict):
+        row['extra'] = {'_item': item}
+        return row
+    extra = {}
+    for key, value in item.items():
+        if key == 'time' and isinstance(value, str):
+            span = parse_time_range(value)
+            if span:
+                row['start_minute'], row['end_minute'] = span
+            if not span or format_time_range(*span) != value:
+                row['time_text'] = value
+        elif key in ITEM_TEXT_COLUMNS and isinstance(value, str) and len(value) <= (ITEM_TEXT_COLUMNS[key] or len(value)):
+            row[key] = value
+        elif key == 'task_id' and (user_id, value) in owned_task_ids:
+            row['task_id'] = value
+        else:
+            extra[key] = value
+    row['extra'] = extra or None
+    return row
+
+
+def item_to_dict(row):
+    """Inverse of item_row: the schedule JSON item"""
+    if row.extra and '_item' in row.extra:
+        return row.extra['_item']
+    item = {}
+    if row.time_text is not None:
+        item['time'] = row.time_text
+    elif row.start_minute is not None:
+        item['time'] = format_time_range(row.start_minute, row.end_minute)
+    for key in ('task', 'reason', 'type', 'task_id'):
+        value = getattr(row, key)
+        if value is not None:
+            item[key] = value
+    if row.extra:
+        item.update(row.extra)
+    return item
+
+
+def schedule_view(header, items):
+    """The stored JSON shape: day-level fields plus the items rebuilt from schedule_item"""
+    if 'schedule' in header:
+        return header  # saved before schedule items existed and not yet migrated
+    return {'schedule': [item_to_dict(item) for item in items], **header}
+
+
+def _owned_task_ids(pairs, batch_size=500):
+    """The (user_id, task_id) pairs that name an existing task of that user"""
+    task_ids_by_user = {}
+    for user_id, task_id in pairs:
+        if isinstance(task_id, int):
+            task_ids_by_user.setdefault(user_id, set()).add(task_id)
+    owned = set()
+    for user_id, task_ids in task_ids_by_user.items():
+        task_ids = sorted(task_ids)
+        for i in range(0, len(task_ids), batch_size):
+            owned.update((user_id, task_id) for task_id in db.session.scalars(
+                select(Task.id).where(Task.user_id == user_id, Task.id.in_(task_ids[i:i + batch_size]))
+            ))
+    return owned
+
+
+def write_schedule_items(rows):
+    """Replace the schedule_item rows of each {user_id, date, schedule_data}; returns the rows with headers only.
+
+    Runs inside the caller's transaction: one executemany DELETE for the
+    days being written and one executemany INSERT for their items.
+    """
+    # The last write of a day wins, as with the schedule upsert itself
+    rows = {(row['user_id'], row['date']): row for row in rows}.values()
+    split = [(row, *split_schedule(row['schedule_data'])) for row in rows]
+    owned = _owned_task_ids([
+        (row['user_id'], item.get('task_id'))
+        for row, _, items in split for item in items if isinstance(item, dict) and 'task_id' in item
+    ])
+    item_table = ScheduleItem.__table__
+    db.session.execute(
+        item_table.delete().where(item_table.c.user_id == bindparam('uid'), item_table.c.date == bindparam('day')),
+        [{'uid': row['user_id'], 'day': row['date']} for row, _, _ in split]
+    )
+    item_rows = [
+        item_row(row['user_id'], row['date'], position, item, owned)
+        for row, _, items in split for position, item in enumerate(items)
+    ]
+    if item_rows:
+        db.session.execute(item_table.insert(), item_rows)
+    return [dict(row, schedule_data=header) for row, header, _ in split]
+
+
+def _load_items(user_id, start, end):
+    """{date: [item rows]} for a user's schedule items between start and end inclusive"""
+    stmt = (
+        select(*ITEM_COLUMNS)
+        .where(ScheduleItem.user_id == user_id, ScheduleItem.date >= start, ScheduleItem.date <= end)
+        .order_by(ScheduleItem.date, ScheduleItem.position)
+    )
+    items = {}
+    for row in db.session.execute(stmt):
+        items.setdefault(row.date, []).append(row)
+    return items
+
+
+def schedule_views(user_id, rows):
+    """(date, schedule_data) for rows of (date, header) in date order, with their items attached"""
+    if not rows:
+        return []
+    items = _load_items(user_id, rows[0].date, rows[-1].date)
+    return [(row.date, schedule_view(row.schedule_data, items.get(row.date, ()))) for row in rows]
+
+
+def load_schedules(user_id, start, end):
+    """Return {date_str: schedule_data} for schedules between start and end inclusive"""
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f'Date range may span at most {MAX_RANGE_DAYS} days')
+
+    stmt = (
+        select(Schedule.date, Schedule.schedule_data)
+        .where(Schedule.user_id == user_id, Schedule.date >= start, Schedule.date <= end)
+        .order_by(Schedule.date)
+    )
+    rows = db.session.execute(stmt).all()
+    return {str(day): data for day, data in schedule_views(user_id, rows)}
+
+
+def load_schedule(user_id, day):
+    """One day's schedule_data, or None"""
+    return load_schedules(user_id, day, day).get(str(day))
+
+
+def summarize_schedule_items(user_id, start, end):
+    """Blocks and scheduled minutes per item type between start and end, aggregated in SQL"""
+    if (end - start).days > MAX_SUMMARY_DAYS:
+        raise ValueError(f'Date range may span at most {MAX_SUMMARY_DAYS} days')
+
+    stmt = (
+        select(ScheduleItem.type,
+               func.count().label('blocks'),
+               func.count(func.distinct(ScheduleItem.date)).label('days'),
+               func.coalesce(func.sum(ScheduleItem.end_minute - ScheduleItem.start_minute), 0).label('minutes'))
+        .where(ScheduleItem.user_id == user_id, ScheduleItem.date >= start, ScheduleItem.date <= end)
+        .group_by(ScheduleItem.type)
+        .order_by(ScheduleItem.type)
+    )
+    return [{'type': row.type, 'blocks': row.blocks, 'days': row.days, 'minutes': int(row.minutes)}
+            for row in db.session.execute(stmt)]
+
+
+def count_schedules(user_id):
+    """Number of saved schedules, answered from the (user_id, date) index"""
+    stmt = select(func.count()).select_from(Schedule).where(Schedule.user_id == user_id)
+    return db.session.execute(stmt).scalar_one()
+
+
+def upsert_schedules(user_id, schedules_by_date):
+    """Insert or replace a user's schedules for several dates in one transaction"""
+    if not schedules_by_date:
+        return
+    existing = {
+        schedule.date: schedule
+        for schedule in Schedule.query.filter(
+            Schedule.user_id == user_id,
+            Schedule.date.in_(list(schedules_by_date))
+        )
+    }
+    rows = write_schedule_items([
+        {'user_id': user_id, 'date': day, 'schedule_data': schedule_data}
+        for day, schedule_data in schedules_by_date.items()
+    ])
+    for row in rows:
+        if row['date'] in existing:
+            existing[row['date']].schedule_data = row['schedule_data']
+        else:
+            db.session.add(Schedule(**row))
+    db.session.commit()
+
+
+def bulk_upsert_schedules(rows):
+    """Upsert many {user_id, date, schedule_data} rows with one executemany.
+
+    SQLite and PostgreSQL resolve conflicts on the (user_id, date) unique
+    index natively; other backends fall back to per-user ORM upserts.
+    """
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        rows = write_schedule_items(rows)
+        now = datetime.utcnow()
+        stmt = insert(Schedule)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Schedule.user_id, Schedule.date],
+            set_={'schedule_data': stmt.excluded.schedule_data, 'created_at': stmt.excluded.created_at}
+        )
+        db.session.execute(stmt, [dict(row, created_at=now) for row in rows])
+        db.session.commit()
+        return
+
+    by_user = {}
+    for row in rows:
+        by_user.setdefault(row['user_id'], {})[row['date']] = row['schedule_data']
+    for user_id, schedules in by_user.items():
+        upsert_schedules(user_id, schedules)
@@ -0,0 +1,190 @@
+"""Date-indexed on-disk storage for the CLI's saved schedules.
+
+Schedules used to live inside tasks_data.json, so every CLI start decoded
+every day ever planned just to show one of them. A ScheduleStore keeps:
+
+    schedules.dat        one JSON line per saved schedule, append-only
+    schedules.dat.idx    one "date offset length" line per save; last one wins
+
+Only the index is read at startup (lazily, on first use); get() slices the
+single record out of a memory map of the data file. Saving a day appends
+the record and then its index line, each fsynced, so a crash leaves at
+worst an unreferenced record or a torn index line, both ignored. Superseded
+records are reclaimed by compact() once they outweigh the live ones.
+
+If the index is missing or disagrees with the data file it is rebuilt by
+scanning the data file.
+"""
+import json
+import mmap
+import os
+from journal_store import _fsync_dir
+
+MIN_COMPACT_BYTES = 256 * 1024
+
+
+class ScheduleStore:
+    def __init__(self, path, min_compact_bytes=MIN_COMPACT_BYTES):
+        self.path = path
+        self.index_path = f'{path}.idx'
+        self.min_compact_bytes = min_compact_bytes
+        self._index = None
+        self._map = None
+        self._map_size = 0
+
+    # Index
+
+    @property
+    def index(self):
+        """{date: (offset, length)}, loaded on first use"""
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def _load_index(self):
+        data_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if data_size and not os.path.exists(self.index_path):
+            return self._rebuild_index()
+        index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                for line in f:
+                    parts = line.split()
+                    if not line.endswith(b'\n') or len(parts) != 3:
+                        break  # torn write from a crash
+                    day, offset, length = parts[0].decode(), int(parts[1]), int(parts[2])
+                    if offset + length <= data_size:
+                        index[day] = (offset, length)
+        return index
+
+    def _rebuild_index(self):
+        index = {}
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    index[json.loads(line)['date']] = (offset, len(line))
+                except (ValueError, KeyError, TypeError):
+                    pass
+                offset += len(line)
+        with open(self.index_path, 'w') as f:
+            for day, (start, length) in index.items():
+                f.write(f'{day} {start} {length}\n')
+        return index
+
+    # Reads
+
+    def __contains__(self, day):
+        return day in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def dates(self):
+        return sorted(self.index)
+
+    def get(self, day, default=None):
+        """The schedule saved for day, reading only that record's bytes"""
+        entry = self.index.get(day)
+        if entry is None:
+            return default
+        record = self._read(*entry)
+        if record is None or record.get('date') != day:
+            # Index out of step with the data (crash mid-compaction): rebuild it
+            self._index = self._rebuild_index()
+            entry = self._index.get(day)
+            record = self._read(*entry) if entry else None
+            if record is None:
+                return default
+        return record['schedule']
+
+    def _read(self, offset, length):
+        if self._map is None or offset + length > self._map_size:
+            self._remap()
+        try:
+            return json.loads(self._map[offset:offset + length])
+        except ValueError:
+            return None
+
+    def items(self):
+        """(date, schedule) for every saved day, in date order"""
+        for day in self.dates():
+            yield day, self.get(day)
+
+    def _remap(self):
+        self._unmap()
+        with open(self.path, 'rb') as f:
+            self._map_size = os.fstat(f.fileno()).st_size
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._map_size = 0
+
+    # Writes
+
+    def put(self, day, schedule):
+        self.put_many([(day, schedule)])
+
+    def put_many(self, schedules):
+        """Save several days with one fsync per file"""
+        index = self.index
+        entries = []
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            for day, schedule in schedules:
+                record = (json.dumps({'date': day, 'schedule': schedule}, separators=(',', ':')) + '\n').encode()
+                f.write(record)
+                entries.append((day, offset, len(record)))
+                offset += len(record)
+            f.flush()
+            os.fsync(f.fileno())
+        if not entries:
+            return
+        # The index line goes last: a record it doesn't reference yet is harmless
+        with open(self.index_path, 'a') as f:
+            for day, start, length in entries:
+                f.write(f'{day} {start} {length}\n')
+            f.flush()
+            os.fsync(f.fileno())
+        for day, start, length in entries:
+            index[day] = (start, length)
+        if self._should_compact():
+            self.compact()
+
+    def _should_compact(self):
+        size = os.path.getsize(self.path)
+        live = sum(length for _, length in self.index.values())
+        return size - live >= max(self.min_compact_bytes, live)
+
+    def compact(self):
+        """Rewrite the data file and index without superseded records"""
+        tmp_data, tmp_index = f'{self.path}.tmp', f'{self.index_path}.tmp'
+        index = {}
+        offset = 0
+        with open(tmp_data, 'wb') as data, open(tmp_index, 'w') as idx:
+            for day in self.dates():
+                start, length = self.index[day]
+                if self._map is None or start + length > self._map_size:
+                    self._remap()
+                data.write(self._map[start:start + length])
+                idx.write(f'{day} {offset} {length}\n')
+                index[day] = (offset, length)
+                offset += length
+            for f in (data, idx):
+                f.flush()
+                os.fsync(f.fileno())
+        self._unmap()
+        # A crash between these leaves the index pointing at the wrong
+        # records; get() notices the date mismatch and rebuilds it
+        os.replace(tmp_data, self.path)
+        os.replace(tmp_index, self.index_path)
+        _fsync_dir(self.path)
+        self._index = index
+
+    def close(self):
+        self._unmap()
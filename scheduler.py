@@ -0,0 +1,388 @@
+"""Interval-based day planner.
+
+A day is modelled as minutes since midnight. Fixed commitments (sleep,
+college/work hours, family time, workout, meals) are carved out of the
+waking window first, then every pending task is placed into the remaining
+free intervals by priority and duration.
+"""
+import bisect
+import json
+import re
+from datetime import date as date_type, timedelta
+from timeutil import MINUTES_PER_DAY, parse_time, parse_time_range, format_time, format_time_range, parse_duration_minutes
+
+PRIORITY_RANKS = {'high': 0, 'medium': 1, 'low': 2}
+DEFAULT_PRIORITY_RANK = 1
+
+# Gap left after each task so blocks don't run back to back
+TASK_BUFFER_MINUTES = 15
+# Tasks at least this long get their buffer shown as an explicit break
+BREAK_AFTER_MINUTES = 60
+
+DEFAULT_WAKE = '7:00 AM'
+DEFAULT_BEDTIME = '11:00 PM'
+DEFAULT_FAMILY = '6:00 PM - 7:00 PM'
+# Used when the prompt mentions college/classes but gives no hours and the profile has none for the day
+DEFAULT_COLLEGE = '9:00 AM - 1:00 PM'
+
+SCHEDULE_TIPS = [
+    "Take 5-min breaks every hour",
+    "Stay hydrated throughout the day",
+    "Maintain good posture while working"
+]
+
+# Preferred windows (start, end) for demanding work, by peak_energy
+PEAK_WINDOWS = {
+    'morning': (6 * 60, 12 * 60),
+    'afternoon': (12 * 60, 17 * 60),
+    'evening': (17 * 60, 21 * 60),
+    'night': (19 * 60, MINUTES_PER_DAY),
+}
+
+_PROMPT_RANGE_RE = re.compile(r"(\d{1,2}:\d{2}\s*(?:am|pm))\s*(?:to|-)\s*(\d{1,2}:\d{2}\s*(?:am|pm))", re.IGNORECASE)
+
+
+def priority_rank(priority):
+    return PRIORITY_RANKS.get((priority or '').strip().lower(), DEFAULT_PRIORITY_RANK)
+
+
+def parse_prompt_hints(prompt):
+    """Extract scheduling hints from the free-text AI prompt"""
+    p = (prompt or '').lower()
+    hints = {
+        'wants_college': any(k in p for k in ['college', 'class', 'lecture']),
+        'morning_focus': 'morning' in p and ('focus' in p or 'deep' in p),
+        'college_range': None,
+    }
+    match = _PROMPT_RANGE_RE.search(p)
+    if match:
+        start, end = parse_time(match.group(1)), parse_time(match.group(2))
+        if start is not None and end is not None and end > start:
+            hints['college_range'] = (start, end)
+    return hints
+
+
+def profile_from_user(user):
+    """Snapshot the profile fields the planner needs into a plain dict"""
+    sleep_schedule = user.sleep_schedule
+    if isinstance(sleep_schedule, str):
+        try:
+            sleep_schedule = json.loads(sleep_schedule)
+        except ValueError:
+            sleep_schedule = {}
+    weekly_schedule = user.weekly_schedule
+    if isinstance(weekly_schedule, str):
+        try:
+            weekly_schedule = json.loads(weekly_schedule)
+        except ValueError:
+            weekly_schedule = {}
+    return {
+        'name': user.name,
+        'role': user.role,
+        'peak_energy': user.peak_energy,
+        'study_preference': getattr(user, 'study_preference', None),
+        'family_time': user.family_time,
+        'workout_preference': user.workout_preference,
+        'workout_impact': getattr(user, 'workout_impact', None),
+        'main_goals': getattr(user, 'main_goals', None),
+        'sleep_schedule': sleep_schedule or {},
+        'weekly_schedule': weekly_schedule or {},
+    }
+
+
+def _field(task, name, default=None):
+    if isinstance(task, dict):
+        return task.get(name, default)
+    return getattr(task, name, default)
+
+
+def weekly_entry_for(weekly_schedule, day):
+    """Find the weekly_schedule entry for a date's weekday.
+
+    Keys are user-typed day names, so match on the first two letters,
+    which is unique across weekdays and tolerates typos like 'Thrusday'.
+    """
+    prefix = day.strftime('%A')[:2].lower()
+    for name, entry in (weekly_schedule or {}).items():
+        if isinstance(entry, dict) and name.strip()[:2].lower() == prefix:
+            return entry
+    return None
+
+
+class FreeIntervals:
+    """Sorted, disjoint free [start, end) intervals in minutes"""
+
+    def __init__(self, start, end):
+        self.starts = [start]
+        self.ends = [end]
+
+    def reserve(self, start, end):
+        """Remove [start, end) from the free set"""
+        i = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        new_starts, new_ends = [], []
+        j = i
+        while j < len(self.starts) and self.starts[j] < end:
+            s, e = self.starts[j], self.ends[j]
+            if e <= start:
+                new_starts.append(s)
+                new_ends.append(e)
+            else:
+                if s < start:
+                    new_starts.append(s)
+                    new_ends.append(start)
+                if e > end:
+                    new_starts.append(end)
+                    new_ends.append(e)
+            j += 1
+        self.starts[i:j] = new_starts
+        self.ends[i:j] = new_ends
+
+    def is_free(self, start, end):
+        i = bisect.bisect_right(self.starts, start) - 1
+        return i >= 0 and self.ends[i] >= end
+
+    def first_fit(self, duration, earliest=0, latest=None):
+        """Earliest start >= earliest where duration fits before latest, or None"""
+        i = max(bisect.bisect_right(self.starts, earliest) - 1, 0)
+        for j in range(i, len(self.starts)):
+            start = max(self.starts[j], earliest)
+            if latest is not None and start + duration > latest:
+                return None
+            if self.ends[j] - start >= duration:
+                return start
+        return None
+
+    def largest(self):
+        return max((e - s for s, e in zip(self.starts, self.ends)), default=0)
+
+
+class DayPlan:
+    """Placed blocks for one day plus the tasks that did not fit"""
+
+    def __init__(self, day, wake, bedtime):
+        self.day = day
+        self.wake = wake
+        self.bedtime = bedtime
+        self.blocks = []
+        self.unscheduled = []
+        self._taken = 0
+
+    @classmethod
+    def for_profile(cls, profile, day=None):
+        """Empty plan bounded by the profile's wake time and bedtime"""
+        sleep = profile.get('sleep_schedule') or {}
+        wake = parse_time(sleep.get('wake_time', DEFAULT_WAKE))
+        bedtime = parse_time(sleep.get('bedtime', DEFAULT_BEDTIME))
+        if wake is None:
+            wake = parse_time(DEFAULT_WAKE)
+        if bedtime is None:
+            bedtime = parse_time(DEFAULT_BEDTIME)
+        if bedtime <= wake:
+            bedtime += MINUTES_PER_DAY
+        return cls(day or date_type.today(), wake, bedtime)
+
+    def add(self, start, end, task, reason, block_type, task_id=None):
+        self.blocks.append((start, end, task, reason, block_type, task_id))
+
+    def take_new(self):
+        """Blocks added since the previous call, for streaming"""
+        new = self.blocks[self._taken:]
+        self._taken = len(self.blocks)
+        return new
+
+    @staticmethod
+    def item(block):
+        """One block as a schedule JSON item; task blocks also carry the task's id"""
+        start, end, task, reason, block_type, task_id = block
+        item = {"time": format_time_range(start, end), "task": task, "reason": reason, "type": block_type}
+        if task_id is not None:
+            item["task_id"] = task_id
+        return item
+
+    def items(self):
+        """Blocks as the schedule JSON items, in time order"""
+        return [self.item(block) for block in sorted(self.blocks, key=lambda b: (b[0], b[1]))]
+
+
+def plan_day(profile, tasks, day=None, hints=None):
+    """Place fixed commitments and every pending task for one day.
+
+    Tasks are ordered by (priority rank, longest first) and placed by
+    first fit, high-priority work preferring the peak-energy window. The
+    sort dominates at O(n log n); each fit is a bisect plus a scan over the
+    day's free gaps, which stays short because a day only has room for a
+    bounded number of blocks, and tasks longer than the largest remaining
+    gap are rejected without scanning.
+    """
+    plan = DayPlan.for_profile(profile, day)
+    for _ in place_blocks(plan, profile, tasks, hints):
+        pass
+    return plan
+
+
+def place_blocks(plan, profile, tasks, hints=None):
+    """Fill an empty DayPlan, yielding each block as soon as it is placed.
+
+    Fixed commitments come out first as one group, then each task (and its
+    break) as it is fitted, so callers can stream a schedule without
+    waiting for the whole day. Blocks arrive in placement order, not time
+    order; plan.items() gives the sorted view once the generator is done.
+    """
+    hints = hints or {}
+    day, wake, bedtime = plan.day, plan.wake, plan.bedtime
+    free = FreeIntervals(wake, bedtime)
+
+    def commit(start, end, task, reason, block_type):
+        start, end = max(start, wake), min(end, bedtime)
+        if end - start < 15 or not free.is_free(start, end):
+            return False
+        free.reserve(start, end)
+        plan.add(start, end, task, reason, block_type)
+        return True
+
+    def commit_flexible(duration, earliest, task, reason, block_type, latest=None):
+        start = free.first_fit(duration, earliest, latest)
+        if start is None:
+            return False
+        return commit(start, start + duration, task, reason, block_type)
+
+    # Anchors around the sleep window
+    commit(wake, wake + 30, "Morning routine & light stretching",
+           "Gentle start to energize your day based on your wake up time", "health")
+    commit(bedtime - 60, bedtime, "Review and plan for tomorrow",
+           "Reflect on the day and prepare for tomorrow based on your bedtime", "personal")
+
+    # College/work hours: an explicit prompt range wins over the weekly profile entry,
+    # which wins over default hours for a prompt that only asks for college
+    if hints.get('college_range'):
+        start, end = hints['college_range']
+        commit(start, end, "College classes", "Prompt-specified college hours", "college")
+    else:
+        entry = weekly_entry_for(profile.get('weekly_schedule'), day)
+        start = end = None
+        if entry:
+            start, end = parse_time(entry.get('start')), parse_time(entry.get('end'))
+        if start is not None and end is not None and end > start:
+            commit(start, end, "College/Work commitments",
+                   f"Scheduled {day.strftime('%A')} hours from your weekly schedule",
+                   entry.get('type') or "college/work")
+        elif hints.get('wants_college'):
+            start, end = parse_time_range(DEFAULT_COLLEGE)
+            if not commit(start, end, "College classes", "Default college hours; none were given for today",
+                          "college"):
+                commit_flexible(end - start, start, "College classes",
+                                "Moved to the nearest free slot; none were given for today", "college")
+
+    family = parse_time_range(profile.get('family_time') or DEFAULT_FAMILY) or parse_time_range(DEFAULT_FAMILY)
+    if not commit(family[0], family[1], "Family time", "Dedicated family time as per your preferences", "family"):
+        commit_flexible(family[1] - family[0], 17 * 60, "Family time",
+                        "Moved to the nearest free slot after your preferred family time was taken", "family")
+
+    workout_pref = (profile.get('workout_preference') or 'evening').lower()
+    workout_reason = f"{workout_pref.capitalize()} workout as per your preferences"
+    if 'morning' in workout_pref:
+        commit_flexible(60, wake + 30, "Workout session", workout_reason, "health", latest=12 * 60)
+    elif not commit(19 * 60, 20 * 60, "Workout session", workout_reason, "health"):
+        commit_flexible(60, 16 * 60, "Workout session", workout_reason, "health")
+
+    commit_flexible(60, 12 * 60, "Lunch break", "Nourishment and rest based on your schedule", "personal",
+                    latest=15 * 60)
+    yield from plan.take_new()
+
+    # Pending tasks, most important and longest first
+    peak = 'morning' if hints.get('morning_focus') else (profile.get('peak_energy') or '').lower()
+    peak_window = PEAK_WINDOWS.get(peak)
+    ordered = sorted(
+        ((_task_rank(task), -_task_minutes(task), i, task) for i, task in enumerate(tasks)),
+        key=lambda entry: entry[:3]
+    )
+    largest_gap = free.largest()
+    for rank, neg_duration, _, task in ordered:
+        duration = -neg_duration
+        if duration > largest_gap:
+            plan.unscheduled.append(task)
+            continue
+        start = None
+        if rank == 0 and peak_window:
+            start = free.first_fit(duration, peak_window[0], peak_window[1])
+        if start is None:
+            start = free.first_fit(duration, wake)
+        if start is None:
+            plan.unscheduled.append(task)
+            continue
+
+        label = "Deep work" if rank == 0 else "Task"
+        reason = ("High energy time for demanding tasks based on your preferences"
+                  if peak_window and peak_window[0] <= start < peak_window[1]
+                  else "Placed by priority in the next free slot")
+        free.reserve(start, start + duration)
+        plan.add(start, start + duration, f"{label} - {_field(task, 'description')}", reason,
+                 _field(task, 'type') or "work", _field(task, 'id'))
+
+        buffer_end = start + duration + TASK_BUFFER_MINUTES
+        if free.is_free(start + duration, buffer_end):
+            free.reserve(start + duration, buffer_end)
+            if duration >= BREAK_AFTER_MINUTES:
+                plan.add(start + duration, buffer_end, "Break", "Short break to refresh your mind", "break")
+        largest_gap = free.largest()
+        yield from plan.take_new()
+
+
+def _task_rank(task):
+    rank = _field(task, 'priority_rank', None)
+    return priority_rank(_field(task, 'priority')) if rank is None else rank
+
+
+def _task_minutes(task):
+    minutes = _field(task, 'duration_minutes', None)
+    return minutes if minutes else parse_duration_minutes(_field(task, 'duration'))
+
+
+def build_schedule_data(plan, summary, tips):
+    """Wrap a DayPlan in the stored schedule JSON shape"""
+    data = {
+        "schedule": plan.items(),
+        "daily_summary": summary,
+        "tips": tips,
+    }
+    if plan.unscheduled:
+        data["unscheduled"] = [_field(task, 'description') for task in plan.unscheduled]
+    return data
+
+
+def plan_days(profile, tasks, days, hints=None):
+    """Plan consecutive days in one pass.
+
+    Each task is placed at most once: whatever does not fit on a day is
+    carried over to the next one, and later days keep only their fixed
+    commitments once the task list is exhausted.
+    """
+    plans = []
+    remaining = list(tasks)
+    for day in days:
+        plan = plan_day(profile, remaining, day, hints)
+        plans.append(plan)
+        remaining = plan.unscheduled
+    return plans
+
+
+def date_range(start, end):
+    """Dates from start to end inclusive"""
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def standard_schedule_data(plan, pending_count):
+    """Schedule JSON for the regular (non-prompted) generator"""
+    return build_schedule_data(
+        plan,
+        f"Personalized schedule based on your wake time ({format_time(plan.wake)}), bedtime ({format_time(plan.bedtime)}), and {pending_count} pending tasks.",
+        list(SCHEDULE_TIPS)
+    )
+
+
+def iter_standard_schedule(profile, tasks, day):
+    """Stream standard_schedule_data: yields items as placed, returns the schedule JSON"""
+    plan = DayPlan.for_profile(profile, day)
+    for block in place_blocks(plan, profile, tasks):
+        yield DayPlan.item(block)
+    return standard_schedule_data(plan, len(tasks))
@@ -0,0 +1,289 @@
+import base64
+import json
+from datetime import datetime
+from itertools import groupby
+from sqlalchemy import select, insert, update, delete
+from models import db, Task, ScheduleItem
+from scheduler import priority_rank
+from timeutil import parse_duration_minutes
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+TASK_ACTIONS = ('add', 'complete', 'reopen', 'delete', 'edit')
+EDITABLE_FIELDS = ('description', 'priority', 'duration', 'type', 'preferences')
+REQUIRED_FIELDS = ('description', 'priority', 'duration', 'type')
+MAX_BATCH_OPS = 500
+
+# Columns needed to render or serialize a task listing. Selecting plain
+# columns returns lightweight rows instead of ORM objects, so read-only
+# listings skip the identity map and change tracking entirely.
+LISTING_COLUMNS = (
+    Task.id,
+    Task.description,
+    Task.priority,
+    Task.duration,
+    Task.type,
+    Task.preferences,
+    Task.status,
+    Task.added_date,
+    Task.completed_date,
+    Task.duration_minutes,
+    Task.priority_rank,
+)
+
+
+def load_task_groups(user_id, columns=LISTING_COLUMNS):
+    """Fetch a user's pending and completed tasks in a single query"""
+    if Task.status not in columns:
+        columns = (*columns, Task.status)
+
+    stmt = (
+        select(*columns)
+        .where(Task.user_id == user_id, Task.status.in_(('pending', 'completed')))
+        .order_by(Task.added_date, Task.id)
+    )
+
+    groups = {'pending': [], 'completed': []}
+    for row in db.session.execute(stmt):
+        groups[row.status].append(row)
+    return groups
+
+
+def load_pending_tasks(user_id, columns=LISTING_COLUMNS):
+    """Fetch only the pending tasks, most important and longest first"""
+    stmt = (
+        select(*columns)
+        .where(Task.user_id == user_id, Task.status == 'pending')
+        .order_by(Task.priority_rank, Task.duration_minutes.desc(), Task.added_date, Task.id)
+    )
+    return db.session.execute(stmt).all()
+
+
+def encode_cursor(row):
+    """Opaque keyset cursor pointing just past the given row"""
+    payload = json.dumps([row.added_date.isoformat() if row.added_date else None, row.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        added_date, task_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(added_date) if added_date else None), int(task_id)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def page_tasks(user_id, status='pending', task_type=None, priority=None,
+               after=None, limit=DEFAULT_PAGE_SIZE, newest_first=False, columns=LISTING_COLUMNS):
+    """Return one keyset page of tasks and the cursor for the next page.
+
+    Ordering is (added_date, id), which the (user_id, status, added_date)
+    index serves directly, so the cost of a page does not depend on how
+    many tasks come before it.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    # Tasks without an added_date sort before every date, and after them
+    # newest-first; spelled out so every backend pages the same way
+    if newest_first:
+        order = (Task.added_date.desc().nulls_last(), Task.id.desc())
+    else:
+        order = (Task.added_date.asc().nulls_first(), Task.id)
+
+    stmt = select(*columns).where(Task.user_id == user_id, Task.status == status)
+    if task_type:
+        stmt = stmt.where(Task.type == task_type)
+    if priority:
+        stmt = stmt.where(Task.priority == priority)
+    if after:
+        # Index seeks in page order - the rest of the cursor's added_date,
+        # then the dates beyond it - rather than one OR/row-value predicate,
+        # which SQLite can only seek on added_date, rescanning every task
+        # that shares it
+        added_date, task_id = decode_cursor(after)
+        same_date = Task.added_date.is_(None) if added_date is None else Task.added_date == added_date
+        seeks = [(same_date, Task.id < task_id if newest_first else Task.id > task_id)]
+        if added_date is None:
+            if not newest_first:
+                seeks.append((Task.added_date.is_not(None),))
+        elif newest_first:
+            seeks += [(Task.added_date < added_date,), (Task.added_date.is_(None),)]
+        else:
+            seeks.append((Task.added_date > added_date,))
+        rows = []
+        for seek in seeks:
+            rows += db.session.execute(stmt.where(*seek).order_by(*order).limit(limit + 1 - len(rows))).all()
+            if len(rows) > limit:
+                break
+    else:
+        rows = db.session.execute(stmt.order_by(*order).limit(limit + 1)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more else None
+    return rows, next_cursor
+
+
+def format_date(value):
+    return value.strftime("%Y-%m-%d") if value else None
+
+
+def pending_task_to_dict(task):
+    return {
+        'id': task.id,
+        'description': task.description,
+        'priority': task.priority,
+        'duration': task.duration,
+        'type': task.type,
+        'preferences': task.preferences,
+        'status': task.status,
+        'added_date': format_date(task.added_date)
+    }
+
+
+def completed_task_to_dict(task):
+    return {
+        'id': task.id,
+        'description': task.description,
+        'type': task.type,
+        'completed_date': format_date(task.completed_date)
+    }
+
+
+def task_to_dict(task):
+    data = pending_task_to_dict(task)
+    data['completed_date'] = format_date(task.completed_date)
+    return data
+
+
+# Batch mutations
+
+class TaskOpError(ValueError):
+    def __init__(self, error, message):
+        super().__init__(message)
+        self.error = error
+        self.message = message
+
+
+def _task_values(op, fields):
+    """Column values for the given fields of op, with the derived sort columns"""
+    values = {}
+    for field in fields:
+        if field not in op:
+            continue
+        value = op[field]
+        if value is not None and not isinstance(value, str):
+            raise TaskOpError('invalid_field', f"{field} must be a string")
+        if field in REQUIRED_FIELDS and not (value or '').strip():
+            raise TaskOpError('invalid_field', f"{field} must not be empty")
+        values[field] = value
+    # Core statements bypass Task's validators, so keep these in step by hand
+    if 'priority' in values:
+        values['priority_rank'] = priority_rank(values['priority'])
+    if 'duration' in values:
+        values['duration_minutes'] = parse_duration_minutes(values['duration'])
+    return values
+
+
+def _parse_op(op):
+    """(action, payload) for one operation; payload is the values, the id or (id, values)"""
+    if not isinstance(op, dict):
+        raise TaskOpError('invalid_op', "each operation must be an object")
+    action = op.get('action')
+    if action not in TASK_ACTIONS:
+        raise TaskOpError('invalid_action', f"action must be one of {', '.join(TASK_ACTIONS)}")
+    if action == 'add':
+        missing = [field for field in REQUIRED_FIELDS if field not in op]
+        if missing:
+            raise TaskOpError('missing_field', f"add needs {', '.join(missing)}")
+        return action, _task_values(op, EDITABLE_FIELDS)
+    try:
+        task_id = int(op.get('id'))
+    except (TypeError, ValueError):
+        raise TaskOpError('invalid_id', f"{action} needs a task id") from None
+    if action == 'edit':
+        values = _task_values(op, EDITABLE_FIELDS)
+        if not values:
+            raise TaskOpError('missing_field', f"edit needs one of {', '.join(EDITABLE_FIELDS)}")
+        return action, (task_id, values)
+    return action, task_id
+
+
+def _op_id(action, payload):
+    return payload[0] if action == 'edit' else payload
+
+
+def apply_task_ops(user_id, ops, now=None):
+    """Apply a batch of task operations for user_id; returns (results, applied).
+
+    Consecutive operations of the same kind run as one statement: adds as
+    a single multi-row INSERT, completes, reopens and deletes as one
+    UPDATE/DELETE ... WHERE id IN (...). Edits change different columns,
+    so each is its own UPDATE. Nothing is committed; the caller commits
+    the whole batch at once. Each result carries the operation's index
+    and either status 'ok' or an error code, and operations that fail
+    validation or name another user's task are skipped, not fatal.
+    """
+    now = now or datetime.now()
+    results = [None] * len(ops)
+    parsed = []
+    for index, op in enumerate(ops):
+        try:
+            parsed.append((index, *_parse_op(op)))
+        except TaskOpError as e:
+            action = op.get('action') if isinstance(op, dict) else None
+            results[index] = {'index': index, 'action': action, 'status': 'error',
+                              'error': e.error, 'message': e.message}
+
+    # One ownership check for every id the batch names
+    ids = {_op_id(action, payload) for _, action, payload in parsed if action != 'add'}
+    owned = set(db.session.scalars(
+        select(Task.id).where(Task.user_id == user_id, Task.id.in_(ids))
+    )) if ids else set()
+
+    for action, run in groupby(parsed, key=lambda entry: entry[1]):
+        run = list(run)
+        if action == 'add':
+            rows = [dict(values, user_id=user_id, status='pending') for _, _, values in run]
+            new_ids = db.session.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+            for (index, _, _), task_id in zip(run, new_ids):
+                results[index] = {'index': index, 'action': action, 'status': 'ok', 'id': task_id}
+            continue
+
+        found = []
+        for index, _, payload in run:
+            task_id = _op_id(action, payload)
+            if task_id in owned:
+                found.append((index, payload))
+                results[index] = {'index': index, 'action': action, 'status': 'ok', 'id': task_id}
+            else:
+                results[index] = {'index': index, 'action': action, 'status': 'error', 'id': task_id,
+                                  'error': 'not_found', 'message': f"No task {task_id}"}
+        if not found:
+            continue
+
+        if action == 'edit':
+            for _, (task_id, values) in found:
+                db.session.execute(update(Task).where(Task.id == task_id).values(**values),
+                                   execution_options={'synchronize_session': False})
+            continue
+
+        run_ids = sorted({task_id for _, task_id in found})
+        where = (Task.user_id == user_id, Task.id.in_(run_ids))
+        if action == 'delete':
+            # Schedules keep their blocks; they just stop pointing at the task.
+            # Done here because SQLite does not enforce the ON DELETE SET NULL
+            db.session.execute(update(ScheduleItem).where(ScheduleItem.task_id.in_(run_ids)).values(task_id=None),
+                               execution_options={'synchronize_session': False})
+            db.session.execute(delete(Task).where(*where), execution_options={'synchronize_session': False})
+            owned.difference_update(run_ids)
+        else:
+            values = ({'status': 'completed', 'completed_date': now} if action == 'complete'
+                      else {'status': 'pending', 'completed_date': None})
+            db.session.execute(update(Task).where(*where).values(**values),
+                               execution_options={'synchronize_session': False})
+
+    applied = sum(1 for result in results if result['status'] == 'ok')
+    return results, applied
@@ -0,0 +1,168 @@
+"""Per-request telemetry written as JSON lines.
+
+    init_request_log(app, 'logs/request_log.jsonl')
+
+Every request produces one record:
+
+    {"ts": 1760000000.123, "method": "POST", "endpoint": "api_tasks",
+     "path": "/api/tasks", "user_id": 7, "status": 200, "latency_ms": 12.4,
+     "db_ms": 3.1, "db_queries": 2, "bytes": 512}
+
+Records are handed to a background thread through a bounded queue and
+written in batches, so a request never waits on disk; if the writer falls
+behind, records are dropped and counted rather than blocking. Files rotate
+by size like logging.handlers.RotatingFileHandler (log, log.1, log.2, ...).
+analyze_requests.py reads them back.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from flask import g, request, has_request_context
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_QUEUE_SIZE = 10000
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_BATCH = 500
+
+
+class RequestLogWriter:
+    """Buffered, size-rotated JSON-lines writer running on its own thread"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                 queue_size=DEFAULT_QUEUE_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='request-log', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record):
+        """Queue a record; never blocks"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        try:
+            self._file.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch))
+            self._file.flush()
+            self.written += len(batch)
+            if self.max_bytes and self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError:
+            self.dropped += len(batch)
+
+    def _rotate(self):
+        self._file.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f'{self.path}.{i}'
+                if os.path.exists(src):
+                    os.replace(src, f'{self.path}.{i + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        """Drain the queue and close the file"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._file.close()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'telemetry_db_ms' in g:
+        context._telemetry_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_telemetry_started', None)
+    if started is not None and has_request_context() and 'telemetry_db_ms' in g:
+        g.telemetry_db_ms += (time.perf_counter() - started) * 1000
+        g.telemetry_db_queries += 1
+
+
+def init_request_timing(app):
+    """Start the per-request wall clock and DB counters (idempotent)"""
+    if app.extensions.get('request_timing'):
+        return
+    app.extensions['request_timing'] = True
+
+    @app.before_request
+    def start_request_timer():
+        g.telemetry_started = time.perf_counter()
+        g.telemetry_db_ms = 0.0
+        g.telemetry_db_queries = 0
+
+
+def request_timings():
+    """(latency_ms, db_ms, db_queries) for the current request so far, or None"""
+    started = g.get('telemetry_started')
+    if started is None:
+        return None
+    return (time.perf_counter() - started) * 1000, g.telemetry_db_ms, g.telemetry_db_queries
+
+
+def init_request_log(app, path, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+    """Attach request telemetry to a Flask app and return the writer"""
+    writer = RequestLogWriter(path, max_bytes, backup_count)
+    init_request_timing(app)
+
+    @app.after_request
+    def log_request(response):
+        timings = request_timings()
+        if timings is None:
+            return response
+        latency_ms, db_ms, db_queries = timings
+        user_id = current_user.get_id()
+        writer.write({
+            'ts': round(time.time(), 3),
+            'method': request.method,
+            'endpoint': request.endpoint,
+            'path': request.path,
+            'user_id': int(user_id) if user_id else None,
+            'status': response.status_code,
+            'latency_ms': round(latency_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'db_queries': db_queries,
+            # Streamed bodies have no length yet; their latency is time to first byte
+            'bytes': None if response.is_streamed else response.calculate_content_length(),
+        })
+        return response
+
+    return writer
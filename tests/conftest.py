@@ -0,0 +1,44 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app reads DATABASE_URL at import time; keep tests off instance/task_optimizer.db
+_db_dir = tempfile.mkdtemp(prefix='taskopt-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+
+@pytest.fixture
+def app():
+    from app import app, db
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user_id(app):
+    from models import db, User
+    with app.app_context():
+        user = User(username='alice', email='alice@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
@@ -0,0 +1,22 @@
+from analyze_requests import analyze
+
+
+def record(ts, latency=10.0, endpoint='api_tasks'):
+    return {'ts': ts, 'endpoint': endpoint, 'latency_ms': latency, 'db_ms': 1.0, 'status': 200}
+
+
+def test_reordering_within_the_grace_window_is_kept():
+    counts = {}
+    rows = list(analyze([record(0), record(70), record(30), record(130)], 60, counts=counts))
+    assert [row['count'] for row in rows] == [2, 1, 1]
+    assert counts['late'] == 0
+
+
+def test_late_record_does_not_reopen_an_emitted_window():
+    counts = {}
+    records = [record(0), record(10), record(200), record(20), record(250)]
+    rows = list(analyze(records, 60, counts=counts))
+    windows = [row['window'] for row in rows]
+    assert len(windows) == len(set(windows)) == 3  # 0s, 180s and 240s, each once
+    assert rows[0]['count'] == 2  # the record at 20s arrived after window 0 was reported
+    assert counts['late'] == 1
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+from flask import Flask
+
+import jobs
+from jobs import JobManager, QueueFull
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocked(job, event):
+    event.wait(5)
+
+
+def test_per_user_and_global_caps(release):
+    manager = JobManager(Flask(__name__), max_workers=1, max_pending=3, max_pending_per_user=2)
+    manager.submit(1, 'test', blocked, release)
+    manager.submit(1, 'test', blocked, release)
+    with pytest.raises(QueueFull) as e:
+        manager.submit(1, 'test', blocked, release)
+    assert e.value.scope == 'user' and e.value.retry_after >= 1
+
+    manager.submit(2, 'test', blocked, release)
+    with pytest.raises(QueueFull) as e:
+        manager.submit(3, 'test', blocked, release)
+    assert e.value.scope == 'global'
+    assert manager.stats()['rejected'] == 2
+
+
+def test_finished_jobs_free_their_slots(release):
+    manager = JobManager(Flask(__name__), max_workers=1, max_pending=1, max_pending_per_user=1)
+    job = manager.submit(1, 'test', blocked, release)
+    release.set()
+    while job.status not in jobs.TERMINAL_STATES:
+        manager.wait(job, job.version, 5)
+    manager.submit(1, 'test', lambda job: None)
+
+
+def test_ai_optimize_rejects_when_queue_is_full(app, client, monkeypatch, release):
+    import app as app_module
+    manager = JobManager(app, max_workers=1, max_pending=2, max_pending_per_user=1)
+    monkeypatch.setattr(app_module, 'job_manager', manager)
+    monkeypatch.setattr(app_module, 'optimize_job', lambda job, *args: release.wait(5))
+
+    assert client.post('/api/ai_optimize', json={}).status_code == 202
+    response = client.post('/api/ai_optimize', json={})
+    assert response.status_code == 429
+    assert response.get_json()['error'] == 'too_many_jobs'
+    assert int(response.headers['Retry-After']) >= 1
+
+    manager.submit(999, 'test', blocked, release)  # someone else takes the last global slot
+    manager.max_pending_per_user = 5
+    response = client.post('/api/ai_optimize', json={})
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
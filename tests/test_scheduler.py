@@ -0,0 +1,28 @@
+from datetime import date
+
+from scheduler import plan_day, standard_schedule_data, parse_prompt_hints
+
+MONDAY = date(2026, 10, 19)
+PROFILE = {'name': 'Alice', 'sleep_schedule': {'wake_time': '7:00 AM', 'bedtime': '11:00 PM'}}
+TASKS = [{'id': 1, 'description': 'Read', 'priority': 'high', 'duration': '1h', 'type': 'study'}]
+
+
+def college_blocks(profile, prompt):
+    plan = plan_day(profile, TASKS, MONDAY, parse_prompt_hints(prompt))
+    return [item for item in standard_schedule_data(plan, len(TASKS))['schedule']
+            if item['type'] in ('college', 'college/work')]
+
+
+def test_college_prompt_without_hours_gets_default_block():
+    blocks = college_blocks(PROFILE, 'I have college today')
+    assert [block['time'] for block in blocks] == ['9:00 AM - 1:00 PM']
+
+
+def test_prompt_range_and_weekly_entry_win_over_default():
+    assert [b['time'] for b in college_blocks(PROFILE, 'college 10:00 am to 2:00 pm')] == ['10:00 AM - 2:00 PM']
+    weekly = dict(PROFILE, weekly_schedule={'Monday': {'start': '8:00 AM', 'end': '12:00 PM'}})
+    assert [b['time'] for b in college_blocks(weekly, 'college today')] == ['8:00 AM - 12:00 PM']
+
+
+def test_no_college_block_unless_asked():
+    assert college_blocks(PROFILE, 'focus on reading') == []
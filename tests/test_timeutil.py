@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+
+from scheduler import plan_day, standard_schedule_data
+from timeutil import parse_time, parse_time_range, parse_duration_minutes, DEFAULT_TASK_MINUTES
+
+
+@pytest.mark.parametrize('value', [9, 9.5, {'h': 9}, ['9 AM'], True])
+def test_time_parsers_ignore_non_text(value):
+    assert parse_time(value) is None
+    assert parse_time_range(value) is None
+
+
+def test_duration_parser_reads_numbers_as_minutes():
+    assert parse_duration_minutes(45) == 45
+    assert parse_duration_minutes('45') == 45
+    assert parse_duration_minutes({'minutes': 45}) == DEFAULT_TASK_MINUTES
+    assert parse_duration_minutes(['1h'], 30) == 30
+    assert parse_duration_minutes(True) == DEFAULT_TASK_MINUTES
+
+
+def test_text_still_parses_and_caches():
+    parse_time.cache_clear()
+    assert parse_time('7:30 PM') == 19 * 60 + 30
+    assert parse_time('7:30 PM') == 19 * 60 + 30
+    assert parse_time.cache_info().hits == 1
+    assert parse_time_range('6:30 - 7:00 PM') == (18 * 60 + 30, 19 * 60)
+
+
+def test_plan_day_skips_numeric_weekly_hours():
+    monday = date(2026, 10, 19)
+    profile = {
+        'name': 'Alice',
+        'sleep_schedule': {'wake_time': '7:00 AM', 'bedtime': 23},
+        'weekly_schedule': {'Monday': {'start': 9, 'end': 17, 'type': 'college/work'}},
+        'family_time': 20,
+    }
+    tasks = [{'id': 1, 'description': 'Read', 'priority': 'high', 'duration': 45, 'type': 'study'}]
+    schedule = standard_schedule_data(plan_day(profile, tasks, monday), len(tasks))['schedule']
+    assert any('Read' in item['task'] for item in schedule)
+    assert not any(item['type'] == 'college/work' for item in schedule)
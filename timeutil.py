@@ -0,0 +1,118 @@
+"""Time-of-day values as integer minutes since midnight.
+
+Every clock string the app sees ("7:00 AM", "19:00", "6:30 - 7:00 PM",
+"8-9 PM") is parsed once through a memoized parser; schedule generation
+then works on plain ints and formats back to text only for output.
+
+The parsers take text. Anything else, such as a number from a hand-edited
+profile, skips the cache and parses as nothing instead of raising.
+"""
+import re
+from functools import lru_cache, wraps
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_TASK_MINUTES = 60
+
+_CLOCK_RE = re.compile(r'^\s*(\d{1,2})(?::(\d{2}))?\s*([ap])?\.?\s*m?\.?\s*$', re.IGNORECASE)
+_RANGE_RE = re.compile(r'\s*(?:-|–|to)\s*', re.IGNORECASE)
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes)?', re.IGNORECASE)
+
+
+def text_cache(maxsize, other=lambda value, *args, **kwargs: None):
+    """lru_cache for a text parser; non-str arguments (which may be unhashable) go to other() instead"""
+    def decorate(fn):
+        cached = lru_cache(maxsize=maxsize)(fn)
+
+        @wraps(fn)
+        def parse(text, *args, **kwargs):
+            if text is None or isinstance(text, str):
+                return cached(text, *args, **kwargs)
+            return other(text, *args, **kwargs)
+
+        parse.cache_clear, parse.cache_info = cached.cache_clear, cached.cache_info
+        return parse
+    return decorate
+
+
+@text_cache(maxsize=1024)
+def parse_time(text, meridiem=None):
+    """Parse '7:00 AM', '7 pm' or '19:00' into minutes since midnight, or None.
+
+    meridiem ('a' or 'p') is applied when the text has none of its own,
+    which lets ranges like '6:30 - 7:00 PM' inherit the trailing PM.
+    """
+    match = _CLOCK_RE.match(text or '')
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    suffix = (match.group(3) or meridiem or '').lower()
+    if minute > 59:
+        return None
+    if suffix:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if suffix == 'p' else 0)
+    elif hour > 23:
+        return None
+    return hour * 60 + minute
+
+
+@text_cache(maxsize=1024)
+def parse_time_range(text):
+    """Parse '6:30 - 7:00 PM' or '8-9 PM' into (start, end) minutes, or None.
+
+    A range that wraps past midnight comes back with end > MINUTES_PER_DAY
+    so that end - start is always its length.
+    """
+    parts = _RANGE_RE.split((text or '').strip(), maxsplit=1)
+    if len(parts) != 2:
+        return None
+    end_match = _CLOCK_RE.match(parts[1])
+    start = parse_time(parts[0], end_match.group(3) if end_match else None)
+    end = parse_time(parts[1])
+    if start is None or end is None:
+        return None
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def add_minutes(minutes, delta):
+    """Shift a time of day, wrapping around midnight"""
+    return (minutes + delta) % MINUTES_PER_DAY
+
+
+def minutes_between(start, end):
+    """Length of the span from start to end, wrapping past midnight if needed"""
+    return (end - start) % MINUTES_PER_DAY
+
+
+def format_time(minutes, clock24=False):
+    """Format minutes since midnight as '7:05 PM' (or '19:05' with clock24)"""
+    hour, minute = divmod(minutes % MINUTES_PER_DAY, 60)
+    if clock24:
+        return f"{hour:02d}:{minute:02d}"
+    return f"{hour % 12 or 12}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def format_time_range(start, end, clock24=False):
+    return f"{format_time(start, clock24)} - {format_time(end, clock24)}"
+
+
+def _duration_from_value(value, default=DEFAULT_TASK_MINUTES):
+    """A bare number is minutes, as '45' would be; anything else gets the default"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return parse_duration_minutes(str(value), default)
+    return default
+
+
+@text_cache(maxsize=256, other=_duration_from_value)
+def parse_duration_minutes(text, default=DEFAULT_TASK_MINUTES):
+    """Parse free-text durations such as '1h', '30m', '1h 30m', '1.5 hours' or '45'"""
+    total = 0.0
+    found = False
+    for amount, unit in _DURATION_RE.findall(text or ''):
+        found = True
+        total += float(amount) * (60 if unit and unit[0].lower() == 'h' else 1)
+    minutes = int(round(total))
+    return minutes if found and minutes > 0 else default
@@ -2,37 +2,113 @@ import json
 import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Any
+from scheduler import priority_rank
+from timeutil import parse_duration_minutes
+from llm_providers import get_provider, ProviderError, ScheduleValidationError
+from journal_store import JournalStore, empty_tasks
+from schedule_store import ScheduleStore
+
+def build_ai_prompt(profile: Dict, pending_tasks: List[Dict], date_str: str, user_request: str = "") -> str:
+    """Build the optimization prompt from a profile and its pending tasks"""
+    request_section = f"\nUSER REQUEST: {user_request}\n" if user_request else ""
+    prompt = f"""You are an intelligent task scheduler helping optimize someone's day.
+
+USER PROFILE:
+- Name: {profile.get('name', 'User')}
+- Role: {profile.get('role', 'Student')}
+- Peak Energy: {profile.get('peak_energy', 'Not specified')}
+- Study Preference: {profile.get('study_preference', 'Not specified')}
+- Sleep Schedule: {profile.get('sleep_schedule', {})}
+- Family Time: {profile.get('family_time', 'Not specified')}
+- Workout Preference: {profile.get('workout_preference', 'Not specified')}
+- Workout Impact: {profile.get('workout_impact', 'Not specified')}
+- Weekly Schedule: {json.dumps(profile.get('weekly_schedule', {}), indent=2)}
+- Main Goals: {profile.get('main_goals', 'Not specified')}
+
+TODAY'S PENDING TASKS:
+{json.dumps(pending_tasks, indent=2)}
+
+DATE: {date_str}
+{request_section}
+Please create an optimized daily schedule considering:
+1. User's energy patterns (schedule demanding tasks during peak energy)
+2. Study preferences (silence requirements, environment)
+3. Workout timing (avoid scheduling after if it causes tiredness)
+4. Family time constraints
+5. Task priorities and deadlines
+6. Realistic time blocks with breaks
+7. College/work schedule if today is a college day
+
+Create a schedule with:
+- Specific time slots (e.g., 7:00 AM - 7:30 AM)
+- Clear, actionable tasks
+- Why each task is scheduled at that time
+- Breaks and buffer time
+- Balance between productivity and wellbeing
+
+Format as JSON:
+{{
+  "schedule": [
+    {{
+      "time": "7:00 AM - 7:30 AM",
+      "task": "Morning workout - Light cardio",
+      "reason": "Scheduled early to energize the day, not too intense to avoid tiredness",
+      "type": "health"
+    }}
+  ],
+  "daily_summary": "Brief overview of the day's plan",
+  "tips": ["Tip 1", "Tip 2"]
+}}
+"""
+    return prompt
+
 
 class AITaskOptimizer:
     def __init__(self):
         self.profile_file = "user_profile.json"
         self.tasks_file = "tasks_data.json"
+        self.schedules_file = "schedules.dat"
+        # Changes are appended to <file>.journal and folded back into the
+        # JSON files periodically (see journal_store.py)
+        self.profile_store = JournalStore(self.profile_file)
+        self.task_store = JournalStore(self.tasks_file, default=empty_tasks)
+        # Saved schedules are read one day at a time (see schedule_store.py)
+        self.schedule_store = ScheduleStore(self.schedules_file)
         self.user_profile = self.load_profile()
         self.tasks = self.load_tasks()
+        self.migrate_schedules()
     
     def load_profile(self) -> Dict:
-        """Load user profile from file or create new one"""
-        if os.path.exists(self.profile_file):
-            with open(self.profile_file, 'r') as f:
-                return json.load(f)
-        return {}
+        """User profile from the snapshot plus journal, or an empty one"""
+        return self.profile_store.data
     
     def save_profile(self):
-        """Save user profile to file"""
-        with open(self.profile_file, 'w') as f:
-            json.dump(self.user_profile, f, indent=2)
+        """Journal the current profile"""
+        self.profile_store.replace(self.user_profile)
+        self.profile_store.commit()
     
     def load_tasks(self) -> Dict:
-        """Load tasks from file"""
-        if os.path.exists(self.tasks_file):
-            with open(self.tasks_file, 'r') as f:
-                return json.load(f)
-        return {"pending": [], "completed": [], "schedules": {}}
+        """Tasks from the snapshot plus journal; schedules live in schedule_store"""
+        return self.task_store.data
+    
+    def migrate_schedules(self):
+        """Move schedules still kept inside tasks_data.json into the schedule store"""
+        schedules = self.tasks.get('schedules')
+        if not schedules:
+            return
+        self.schedule_store.put_many(schedules.items())
+        self.tasks['schedules'] = {}
+        self.task_store.compact()
     
     def save_tasks(self):
-        """Save tasks to file"""
-        with open(self.tasks_file, 'w') as f:
-            json.dump(self.tasks, f, indent=2)
+        """Rewrite tasks_data.json from memory, e.g. after editing self.tasks directly"""
+        self.task_store.compact()
+    
+    def close(self):
+        """Flush the journals and fold them into the JSON files"""
+        self.task_store.close()
+        self.profile_store.close()
+        self.schedule_store.close()
     
     def setup_profile(self):
         """Interactive profile setup"""
@@ -103,6 +179,8 @@ class AITaskOptimizer:
                 "description": task_desc,
                 "priority": priority,
                 "duration": duration,
+                "duration_minutes": parse_duration_minutes(duration),
+                "priority_rank": priority_rank(priority),
                 "type": task_type,
                 "preferences": preferences,
                 "status": "pending",
@@ -110,64 +188,15 @@ class AITaskOptimizer:
             }
             
             tasks.append(task)
-            # Fixed: Only add the current task, not all tasks in the list
-            self.tasks['pending'].append(task)
+            self.task_store.add_task(task)
         
-        self.save_tasks()
+        # One fsync for the whole batch
+        self.task_store.commit()
         print(f"\n✓ Added {len(tasks)} tasks!\n")
     
     def generate_ai_prompt(self, date_str: str) -> str:
         """Generate prompt for AI optimization"""
-        prompt = f"""You are an intelligent task scheduler helping optimize someone's day.
-
-USER PROFILE:
-- Name: {self.user_profile.get('name', 'User')}
-- Role: {self.user_profile.get('role', 'Student')}
-- Peak Energy: {self.user_profile.get('peak_energy', 'Not specified')}
-- Study Preference: {self.user_profile.get('study_preference', 'Not specified')}
-- Sleep Schedule: {self.user_profile.get('sleep_schedule', {})}
-- Family Time: {self.user_profile.get('family_time', 'Not specified')}
-- Workout Preference: {self.user_profile.get('workout_preference', 'Not specified')}
-- Workout Impact: {self.user_profile.get('workout_impact', 'Not specified')}
-- Weekly Schedule: {json.dumps(self.user_profile.get('weekly_schedule', {}), indent=2)}
-- Main Goals: {self.user_profile.get('main_goals', 'Not specified')}
-
-TODAY'S PENDING TASKS:
-{json.dumps(self.tasks.get('pending', []), indent=2)}
-
-DATE: {date_str}
-
-Please create an optimized daily schedule considering:
-1. User's energy patterns (schedule demanding tasks during peak energy)
-2. Study preferences (silence requirements, environment)
-3. Workout timing (avoid scheduling after if it causes tiredness)
-4. Family time constraints
-5. Task priorities and deadlines
-6. Realistic time blocks with breaks
-7. College/work schedule if today is a college day
-
-Create a schedule with:
-- Specific time slots (e.g., 7:00 AM - 7:30 AM)
-- Clear, actionable tasks
-- Why each task is scheduled at that time
-- Breaks and buffer time
-- Balance between productivity and wellbeing
-
-Format as JSON:
-{{
-  "schedule": [
-    {{
-      "time": "7:00 AM - 7:30 AM",
-      "task": "Morning workout - Light cardio",
-      "reason": "Scheduled early to energize the day, not too intense to avoid tiredness",
-      "type": "health"
-    }}
-  ],
-  "daily_summary": "Brief overview of the day's plan",
-  "tips": ["Tip 1", "Tip 2"]
-}}
-"""
-        return prompt
+        return build_ai_prompt(self.user_profile, self.tasks.get('pending', []), date_str)
     
     def optimize_schedule(self, date_str: str = None):
         """Generate optimized schedule using AI logic"""
@@ -191,10 +220,21 @@ Format as JSON:
                 "message": "Please add some pending tasks before generating an optimized schedule."
             }
         
-        # Here you would call the AI API (Claude/OpenAI)
-        # For now, I'll show the prompt that would be sent
         prompt = self.generate_ai_prompt(date_str)
         
+        # Send the prompt to the configured model (LLM_PROVIDER=anthropic|stub)
+        provider = get_provider(os.environ)
+        if provider:
+            try:
+                schedule = provider.optimize(prompt)
+            except (ProviderError, ScheduleValidationError) as e:
+                print(f"\n⚠ AI optimization failed: {e}\n")
+                return {"error": "AI unavailable", "message": str(e)}
+            self.schedule_store.put(date_str, schedule)
+            print("\n✓ Optimized schedule saved! View it with option 4.\n")
+            return schedule
+        
+        # No provider configured: show the prompt that would be sent
         print("=" * 60)
         print("AI OPTIMIZATION PROMPT (This would be sent to Claude API):")
         print("=" * 60)
@@ -204,7 +244,7 @@ Format as JSON:
         # Simulated AI response (you'll replace this with actual API call)
         print("\n📝 To use AI optimization:")
         print("1. Get an Anthropic API key from console.anthropic.com")
-        print("2. Install: pip install anthropic")
+        print("2. Set LLM_PROVIDER=anthropic and LLM_API_KEY=<your key>")
         print("3. The system will send the above prompt to Claude")
         print("4. Claude will return an optimized schedule\n")
         
@@ -235,10 +275,9 @@ Format as JSON:
         if not date_str:
             date_str = datetime.now().strftime("%Y-%m-%d")
         
-        schedules = self.tasks.get('schedules', {})
+        schedule = self.schedule_store.get(date_str)
         
-        if date_str in schedules:
-            schedule = schedules[date_str]
+        if schedule is not None:
             print(f"\n=== SCHEDULE FOR {date_str} ===\n")
             
             for item in schedule.get('schedule', []):
@@ -315,6 +354,7 @@ Format as JSON:
             elif choice == '6':
                 self.show_profile()
             elif choice == '7':
+                self.close()
                 print("\n👋 Goodbye! Stay productive!\n")
                 break
             else:
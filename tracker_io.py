@@ -0,0 +1,429 @@
+"""Move data between the CLI's JSON files and the web app's tables.
+
+    python tracker_io.py import alice                      # user_profile.json + tasks_data.json
+    python tracker_io.py import alice --tasks big.json --chunk-size 5000 --no-profile
+    python tracker_io.py export alice --tasks out.json --profile out_profile.json
+
+tasks_data.json is read with an incremental parser, one task or schedule
+at a time, and written to the database in batched bulk statements, so a
+file with years of history imports in bounded memory. Imports are
+idempotent: tasks upsert on (user, CLI task id) and schedules on (user,
+date), so re-running an import updates rows instead of duplicating them.
+Exports stream rows out with keyset pagination and write the same JSON
+shape the CLI reads. They need explicit --tasks/--profile paths and will
+not replace an existing file without --force, nor one with a pending
+.journal, which the CLI would replay over the export.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import uuid
+from datetime import datetime
+from sqlalchemy import select, update, insert
+from app import app
+from models import db, User, Task, Schedule
+from schedule_repository import bulk_upsert_schedules, schedule_views
+from scheduler import priority_rank
+from task_repository import page_tasks, MAX_PAGE_SIZE
+from journal_store import iter_journal
+from schedule_store import ScheduleStore
+from timeutil import parse_duration_minutes
+
+DEFAULT_CHUNK_SIZE = 1000
+READ_SIZE = 64 * 1024
+
+PROFILE_FIELDS = (
+    'name', 'role', 'schedule_days', 'weekly_schedule', 'peak_energy', 'study_preference',
+    'sleep_schedule', 'family_time', 'workout_preference', 'workout_impact', 'main_goals',
+)
+TASK_UPDATE_FIELDS = (
+    'description', 'priority', 'duration', 'type', 'preferences', 'status', 'added_date',
+    'completed_date', 'duration_minutes', 'priority_rank',
+)
+
+
+class JsonStream:
+    """Pull-parser over a file holding one large JSON object.
+
+    Only the container structure is walked by hand; each element is decoded
+    with json's raw_decode from a buffer that is refilled on demand and
+    trimmed as it is consumed, so memory is bounded by the largest single
+    element rather than the file.
+    """
+
+    def __init__(self, f, read_size=READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        chunk = self.f.read(size or self.read_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > len(self.buffer) // 2:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise ValueError(f'Expected one of {chars!r} at offset {self.pos}, found {char!r}')
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        size = self.read_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value touching the end of the buffer may be cut short (e.g. a number)
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            size *= 2
+            self._fill(size)
+
+    def items(self):
+        """Iterate the keys of an object; the caller consumes each value before resuming"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def elements(self):
+        """Iterate the decoded elements of an array"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_tracker_file(f):
+    """Yield ('task', dict) and ('schedule', (date_str, data)) records from tasks_data.json"""
+    stream = JsonStream(f)
+    for section in stream.items():
+        if section in ('pending', 'completed') and stream.peek() == '[':
+            for task in stream.elements():
+                if isinstance(task, dict):
+                    task.setdefault('status', section)
+                    yield 'task', task
+        elif section == 'schedules' and stream.peek() == '{':
+            for date_str in stream.items():
+                yield 'schedule', (date_str, stream.value())
+        else:
+            stream.value()  # unknown section: decode and drop
+
+
+def iter_journal_records(journal_path):
+    """The same records for changes the CLI has journaled but not yet compacted"""
+    for op, _ in iter_journal(journal_path):
+        if op.get('op') == 'add_task':
+            task = dict(op['task'])
+            task.setdefault('status', 'pending')
+            yield 'task', task
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def external_task_id(task):
+    """The CLI's task id, or a content hash for legacy entries that have none"""
+    if task.get('id'):
+        return str(task['id'])[:64]
+    digest = hashlib.sha1(json.dumps(
+        [task.get('description'), task.get('added_date'), task.get('duration'), task.get('priority')]
+    ).encode()).hexdigest()
+    return f'sha1-{digest[:32]}'
+
+
+def task_row(user_id, task):
+    priority = str(task.get('priority') or 'medium')[:20]
+    duration = str(task.get('duration') or '1h')[:20]
+    status = 'completed' if task.get('status') == 'completed' else 'pending'
+    return {
+        'user_id': user_id,
+        'external_id': external_task_id(task),
+        'description': str(task.get('description') or 'Untitled task')[:200],
+        'priority': priority,
+        'duration': duration,
+        'type': str(task.get('type') or 'personal')[:50],
+        'preferences': (str(task['preferences'])[:200] if task.get('preferences') else None),
+        'status': status,
+        'added_date': _parse_date(task.get('added_date')) or datetime.utcnow(),
+        'completed_date': _parse_date(task.get('completed_date')) if status == 'completed' else None,
+        'duration_minutes': parse_duration_minutes(duration),
+        'priority_rank': priority_rank(priority),
+    }
+
+
+def upsert_tasks(rows):
+    """Insert or update task rows on (user_id, external_id) in one executemany"""
+    if not rows:
+        return
+    # Duplicate ids inside one batch would conflict with each other; last one wins
+    rows = list({(row['user_id'], row['external_id']): row for row in rows}.values())
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(Task)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Task.user_id, Task.external_id],
+            set_={name: stmt.excluded[name] for name in TASK_UPDATE_FIELDS}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    existing = {}
+    for user_id in {row['user_id'] for row in rows}:
+        ids = [row['external_id'] for row in rows if row['user_id'] == user_id]
+        existing.update({
+            (user_id, external_id): task_id
+            for task_id, external_id in db.session.execute(
+                select(Task.id, Task.external_id).where(Task.user_id == user_id, Task.external_id.in_(ids)))
+        })
+    updates = [dict(row, id=existing[(row['user_id'], row['external_id'])])
+               for row in rows if (row['user_id'], row['external_id']) in existing]
+    inserts = [row for row in rows if (row['user_id'], row['external_id']) not in existing]
+    if updates:
+        db.session.execute(update(Task), updates)
+    if inserts:
+        db.session.execute(insert(Task), inserts)
+
+
+def import_profile(user, profile):
+    for field in PROFILE_FIELDS:
+        if field in profile:
+            setattr(user, field, profile[field])
+    db.session.commit()
+
+
+def import_tasks_file(user_id, f, chunk_size=DEFAULT_CHUNK_SIZE, journal_path=None, schedules_path=None):
+    """Stream a tasks_data.json file (plus its journal and schedule store, if any) into the database; returns counts"""
+    stats = {'tasks': 0, 'schedules': 0, 'skipped': 0}
+    tasks, schedules = [], []
+
+    def flush_tasks():
+        upsert_tasks(tasks)
+        db.session.commit()
+        tasks.clear()
+
+    def flush_schedules():
+        bulk_upsert_schedules(schedules)  # commits
+        schedules.clear()
+
+    records = iter_tracker_file(f)
+    if journal_path:
+        records = itertools.chain(records, iter_journal_records(journal_path))
+    if schedules_path and os.path.exists(schedules_path):
+        store = ScheduleStore(schedules_path)
+        records = itertools.chain(records, (('schedule', item) for item in store.items()))
+    for kind, record in records:
+        if kind == 'task':
+            tasks.append(task_row(user_id, record))
+            stats['tasks'] += 1
+            if len(tasks) >= chunk_size:
+                flush_tasks()
+        else:
+            date_str, data = record
+            try:
+                day = datetime.strptime(date_str, "%Y-%m-%d").date()
+            except ValueError:
+                stats['skipped'] += 1
+                continue
+            if not isinstance(data, dict):
+                stats['skipped'] += 1
+                continue
+            schedules.append({'user_id': user_id, 'date': day, 'schedule_data': data})
+            stats['schedules'] += 1
+            if len(schedules) >= chunk_size:
+                flush_schedules()
+    flush_tasks()
+    flush_schedules()
+    return stats
+
+
+def export_profile(user):
+    return {field: getattr(user, field) for field in PROFILE_FIELDS if getattr(user, field) is not None}
+
+
+def _assign_external_ids(user_id, chunk_size):
+    """Give web-created tasks a CLI-style id so a later import of the export matches them"""
+    while True:
+        ids = db.session.execute(
+            select(Task.id).where(Task.user_id == user_id, Task.external_id.is_(None)).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return
+        db.session.execute(update(Task), [{'id': task_id, 'external_id': str(uuid.uuid4())} for task_id in ids])
+        db.session.commit()
+
+
+def _iter_tasks(user_id, status, columns):
+    """Every task with a status, page by page along the (user_id, status, added_date) index"""
+    cursor = None
+    while True:
+        rows, cursor = page_tasks(user_id, status, after=cursor, limit=MAX_PAGE_SIZE, columns=columns)
+        yield from rows
+        if not cursor:
+            return
+
+
+def _iter_schedules(user_id, chunk_size):
+    """(date, schedule_data) for every schedule in date order, keyset-paginated on the (user_id, date) index"""
+    stmt = select(Schedule.date, Schedule.schedule_data).where(Schedule.user_id == user_id).order_by(Schedule.date)
+    last = None
+    while True:
+        page = stmt if last is None else stmt.where(Schedule.date > last)
+        rows = db.session.execute(page.limit(chunk_size)).all()
+        if not rows:
+            return
+        yield from schedule_views(user_id, rows)
+        last = rows[-1].date
+
+
+def export_tasks_file(user_id, f, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write a user's tasks and schedules in the tasks_data.json shape; returns counts"""
+    _assign_external_ids(user_id, chunk_size)
+    stats = {'tasks': 0, 'schedules': 0}
+    columns = (Task.id, Task.external_id, Task.description, Task.priority, Task.duration, Task.type,
+               Task.preferences, Task.status, Task.added_date, Task.completed_date)
+
+    f.write('{\n')
+    for i, status in enumerate(('pending', 'completed')):
+        f.write(f'{"," if i else ""}\n  "{status}": [')
+        for n, row in enumerate(_iter_tasks(user_id, status, columns)):
+            task = {
+                'id': row.external_id,
+                'description': row.description,
+                'priority': row.priority,
+                'duration': row.duration,
+                'type': row.type,
+                'preferences': row.preferences,
+                'status': row.status,
+                'added_date': row.added_date.strftime("%Y-%m-%d") if row.added_date else None,
+            }
+            if status == 'completed':
+                task['completed_date'] = row.completed_date.strftime("%Y-%m-%d") if row.completed_date else None
+            f.write((',' if n else '') + '\n    ' + json.dumps(task))
+            stats['tasks'] += 1
+        f.write('\n  ]')
+
+    f.write(',\n  "schedules": {')
+    for n, (day, schedule_data) in enumerate(_iter_schedules(user_id, chunk_size)):
+        f.write((',' if n else '') + f'\n    {json.dumps(str(day))}: {json.dumps(schedule_data)}')
+        stats['schedules'] += 1
+    f.write('\n  }\n}\n')
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import/export CLI tracker JSON to/from the database')
+    parser.add_argument('command', choices=['import', 'export'])
+    parser.add_argument('username', help='web app user to import into or export from')
+    parser.add_argument('--tasks', help='tasks/schedules JSON file (import default: tasks_data.json)')
+    parser.add_argument('--schedules', default='schedules.dat',
+                        help='CLI schedule store, also read on import (export writes schedules into --tasks)')
+    parser.add_argument('--profile', help='profile JSON file (import default: user_profile.json)')
+    parser.add_argument('--no-profile', action='store_true', help='skip the profile file')
+    parser.add_argument('--force', action='store_true', help='let export replace existing files')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per bulk statement')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        if args.profile is None:
+            # The CLI only writes a profile once one is set up, so the default is optional
+            args.profile = 'user_profile.json'
+            if not args.no_profile and not os.path.exists(args.profile):
+                print(f"No {args.profile}; importing without a profile")
+                args.no_profile = True
+        args.tasks = args.tasks or 'tasks_data.json'
+        for path in [args.tasks] + ([] if args.no_profile else [args.profile]):
+            if not os.path.exists(path):
+                parser.error(f'{path} does not exist')
+    else:
+        # The defaults are the CLI's live files; an export must name where it goes
+        outputs = [args.tasks] + ([] if args.no_profile else [args.profile])
+        if None in outputs:
+            parser.error('export needs --tasks and --profile (or --no-profile)')
+        for path in outputs:
+            if os.path.exists(f'{path}.journal'):
+                parser.error(f'{path}.journal exists; the CLI would replay it over the export')
+            if os.path.exists(path) and not args.force:
+                parser.error(f'{path} exists; pass --force to replace it')
+
+    with app.app_context():
+        user = User.query.filter_by(username=args.username).first()
+        if not user:
+            print(f"No user named {args.username!r}")
+            return 1
+
+        if args.command == 'import':
+            if not args.no_profile:
+                with open(args.profile) as f:
+                    profile = json.load(f)  # a profile is a handful of keys
+                for op, _ in iter_journal(f'{args.profile}.journal'):
+                    if op.get('op') == 'replace':
+                        profile = op['data']
+                import_profile(user, profile)
+                print(f"Imported profile from {args.profile}")
+            with open(args.tasks) as f:
+                stats = import_tasks_file(user.id, f, args.chunk_size, journal_path=f'{args.tasks}.journal',
+                                         schedules_path=args.schedules)
+            print(f"Imported {stats['tasks']} tasks and {stats['schedules']} schedules from {args.tasks}"
+                  + (f" ({stats['skipped']} malformed schedules skipped)" if stats['skipped'] else ""))
+        else:
+            if not args.no_profile:
+                with open(args.profile, 'w') as f:
+                    json.dump(export_profile(user), f, indent=2)
+                print(f"Exported profile to {args.profile}")
+            with open(args.tasks, 'w') as f:
+                stats = export_tasks_file(user.id, f, args.chunk_size)
+            print(f"Exported {stats['tasks']} tasks and {stats['schedules']} schedules to {args.tasks}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
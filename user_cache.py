@@ -0,0 +1,79 @@
+"""Per-process cache of the logged-in user's identity row.
+
+Flask-Login calls load_user on every authenticated request. Instead of a
+SELECT each time, the cache keeps the user's non-deferred column values
+for a short TTL and rebuilds a detached User from them, attached to the
+request's session without a query. Deferred columns (the profile JSON and
+the password hash) stay unloaded and are fetched on first access, as for
+any other loaded instance.
+
+Entries are dropped explicitly when a request changes the user
+(invalidate), and otherwise expire after the TTL, which bounds how stale
+another worker process's copy can be.
+"""
+import threading
+import time
+from collections import OrderedDict
+from models import db, User
+
+DEFAULT_TTL_SECONDS = 60
+DEFAULT_MAX_ENTRIES = 10000
+
+# Everything the cache stores; deferred columns are left for lazy loading
+CACHED_COLUMNS = tuple(attr.key for attr in User.__mapper__.column_attrs if not attr.deferred)
+
+
+class UserCache:
+    def __init__(self, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, {column: value})
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def load(self, user_id):
+        """The user as a persistent instance in the current session, or None"""
+        session = db.session
+        existing = session.identity_map.get(session.identity_key(User, user_id))
+        if existing is not None:
+            return existing
+
+        values = self._get(user_id)
+        if values is None:
+            user = session.get(User, user_id)
+            if user is not None and self.ttl > 0:
+                self._put(user_id, {key: getattr(user, key) for key in CACHED_COLUMNS})
+            return user
+
+        user = User(**values)
+        # Treat the values as freshly loaded; the deferred columns become expired
+        db.orm.make_transient_to_detached(user)
+        session.add(user)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.counters['invalidations'] += 1
+
+    def _get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.counters['hits'] += 1
+            return entry[1]
+
+    def _put(self, user_id, values):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries))
@@ -0,0 +1,88 @@
+from sqlalchemy import select, func, literal, union_all, or_, case
+from models import db, User, Task, Schedule
+
+ADMIN_PAGE_SIZE = 50
+MAX_ADMIN_PAGE_SIZE = 200
+
+# What the admin list shows; the profile columns (JSON included) stay unloaded
+ADMIN_LISTING_COLUMNS = (User.id, User.username, User.email, User.is_admin, User.created_at)
+
+# Sorts after any character a username or email can contain
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def prefix_match(column, prefix):
+    """Case-insensitive prefix test as a range on lower(column), which its expression index serves.
+
+    The prefix goes through the database's own lower() as well, so both
+    sides are folded alike. On SQLite that folds ASCII only: "É" finds
+    "Émile" but "é" does not.
+    """
+    lowered = func.lower(column)
+    return (lowered >= func.lower(prefix)) & (lowered < func.lower(prefix + PREFIX_UPPER_BOUND))
+
+
+def page_users(search=None, after=None, before=None, limit=ADMIN_PAGE_SIZE):
+    """One keyset page of users by id, optionally filtered by username/email prefix.
+
+    Returns (rows, prev_cursor, next_cursor), where the cursors are user
+    ids to pass back as before/after. Each page is an index seek, so its
+    cost does not depend on how many users precede it.
+    """
+    limit = max(1, min(int(limit), MAX_ADMIN_PAGE_SIZE))
+    stmt = select(*ADMIN_LISTING_COLUMNS)
+    if search:
+        stmt = stmt.where(or_(prefix_match(User.username, search), prefix_match(User.email, search)))
+
+    if before is not None:
+        rows = db.session.execute(
+            stmt.where(User.id < before).order_by(User.id.desc()).limit(limit + 1)
+        ).all()
+        has_prev = len(rows) > limit
+        rows = rows[:limit][::-1]
+        has_next = True
+    else:
+        if after is not None:
+            stmt = stmt.where(User.id > after)
+        rows = db.session.execute(stmt.order_by(User.id).limit(limit + 1)).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        has_prev = after is not None
+
+    prev_cursor = rows[0].id if rows and has_prev else None
+    next_cursor = rows[-1].id if rows and has_next else None
+    return rows, prev_cursor, next_cursor
+
+
+def user_activity_counts(user_ids):
+    """{user_id: {'pending', 'completed', 'schedules'}} for a page of users in one query.
+
+    Task and schedule rows are read from their (user_id, ...) indexes and
+    folded by a single GROUP BY, instead of loading each user's tasks and
+    schedules relationships.
+    """
+    counts = {user_id: {'pending': 0, 'completed': 0, 'schedules': 0} for user_id in user_ids}
+    if not counts:
+        return counts
+
+    tasks = select(
+        Task.user_id.label('user_id'),
+        case((Task.status == 'pending', 1), else_=0).label('pending'),
+        case((Task.status == 'completed', 1), else_=0).label('completed'),
+        literal(0).label('schedules'),
+    ).where(Task.user_id.in_(counts))
+    schedules = select(
+        Schedule.user_id.label('user_id'), literal(0), literal(0), literal(1),
+    ).where(Schedule.user_id.in_(counts))
+    activity = union_all(tasks, schedules).subquery()
+
+    stmt = select(
+        activity.c.user_id,
+        func.sum(activity.c.pending),
+        func.sum(activity.c.completed),
+        func.sum(activity.c.schedules),
+    ).group_by(activity.c.user_id)
+    for user_id, pending, completed, schedule_count in db.session.execute(stmt):
+        counts[user_id] = {'pending': int(pending or 0), 'completed': int(completed or 0),
+                           'schedules': int(schedule_count or 0)}
+    return counts